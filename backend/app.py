@@ -0,0 +1,375 @@
+from detect_and_generate import detect_and_generate_3d, result_cache, detection_cache
+from fastapi import FastAPI, UploadFile, File, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from starlette.concurrency import run_in_threadpool
+from fastapi import HTTPException
+from scaling import compute_scale
+from classification_utils import cairosvg, dxf_to_png
+from floorplan_classification import (
+    process_image,
+    classify_batch,
+    get_classifier,
+    CLASSIFIER_BACKENDS,
+)
+from model_registry import registry
+from worker_pool import WorkerPool, PoolFullError
+from jobs import JobManager
+from janitor import Janitor
+from tracing import trace, span, request_duration, render_metrics
+import extrusion_pool
+from constants import (
+    WORKER_THREADS,
+    WORKER_QUEUE_SIZE,
+    JOB_CONCURRENCY,
+    JOB_QUEUE_SIZE,
+    JOB_TTL_SECONDS,
+    JOB_TIMEOUT_SECONDS,
+    JOB_DIR,
+    JOB_RESULTS_MAX_MB,
+    CLEANUP_DIRS,
+    CLEANUP_MAX_AGE_HOURS,
+    CLEANUP_INTERVAL_SECONDS,
+    GLB_GZIP_LEVEL,
+    RESULT_CACHE_DIR,
+    DETECTION_CACHE_DIR,
+    GEOMETRY_CACHE_DIR,
+    ASSET_CACHE_DIR,
+    PROFILE_REQUESTS,
+    PROFILE_DIR,
+    PREDICT_BATCH_MAX_FILES,
+    WARMUP_MODELS,
+    check_paths,
+)
+from my_logger import my_logger
+from fastapi import Form
+from typing import List, Tuple
+import gzip
+import io
+import os
+import threading
+import time
+
+
+# Créer l'app FastAPI
+app = FastAPI()
+
+# Pool de travail pour les traitements lourds (hors boucle d'événements)
+pool = WorkerPool(max_workers=WORKER_THREADS, max_queue=WORKER_QUEUE_SIZE)
+
+# File de jobs pour l'API asynchrone de génération 3D
+jobs = JobManager(
+    JOB_DIR,
+    concurrency=JOB_CONCURRENCY,
+    max_queue=JOB_QUEUE_SIZE,
+    ttl=JOB_TTL_SECONDS,
+    timeout=JOB_TIMEOUT_SECONDS,
+    max_result_bytes=JOB_RESULTS_MAX_MB * 1024**2,
+)
+
+# Suppression des vieux fichiers de uploads/ et outputs/ (les caches et les
+# jobs gèrent eux-mêmes leur taille)
+janitor = Janitor(
+    CLEANUP_DIRS,
+    max_age=CLEANUP_MAX_AGE_HOURS * 3600,
+    interval=CLEANUP_INTERVAL_SECONDS,
+    exclude=[
+        RESULT_CACHE_DIR,
+        DETECTION_CACHE_DIR,
+        GEOMETRY_CACHE_DIR,
+        ASSET_CACHE_DIR,
+        JOB_DIR,
+    ],
+)
+
+from fastapi.middleware.cors import CORSMiddleware
+
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:5173"],  # frontend
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    request_duration.observe(path, time.perf_counter() - start)
+    return response
+
+
+@app.exception_handler(PoolFullError)
+async def pool_full_handler(request: Request, exc: PoolFullError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry later."},
+        headers={"Retry-After": "5"},
+    )
+
+
+# État du préchargement de chaque modèle ("loading", "ready" ou "failed: ..."),
+# exposé par /ready
+warmup_status = {}
+
+
+def warmup_in_background(*names):
+    """Charge les modèles dans un thread : le serveur accepte les requêtes tout de suite."""
+    for name in names:
+        warmup_status[name] = "loading"
+
+    def run():
+        for name in names:
+            try:
+                registry.warmup(name)
+                warmup_status[name] = "ready"
+            except Exception as e:
+                my_logger.warning(f"Préchargement du modèle {name} impossible : {e}")
+                warmup_status[name] = f"failed: {e}"
+
+    threading.Thread(target=run, name="warmup", daemon=True).start()
+
+
+@app.on_event("startup")
+async def warmup_models():
+    check_paths()
+    # Charger les modèles au démarrage pour que la première requête soit rapide
+    warmup_in_background(*WARMUP_MODELS)
+    janitor.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_pool():
+    pool.shutdown(wait=False)
+    jobs.pool.shutdown(wait=False)
+    extrusion_pool.shutdown()
+    janitor.stop()
+
+
+def file_to_image_bytes(file_bytes, content_type, filename):
+    """Convertit le fichier en PNG si besoin (SVG, DXF)."""
+    # Convert SVG to PNG
+    if content_type == "image/svg+xml":
+        return cairosvg(file_bytes)
+
+    # Convert DXF to PNG
+    elif content_type == "application/dxf" or filename.endswith(".dxf"):
+        return dxf_to_png(file_bytes)
+
+    # Use file as-is for other image formats
+    return file_bytes
+
+
+def classify_file(file_bytes, content_type, filename, backend="efficientnet"):
+    """Convertit le fichier en PNG si besoin puis le classifie."""
+    image_bytes = file_to_image_bytes(file_bytes, content_type, filename)
+    model, decode = get_classifier(backend)
+    return process_image(image_bytes, model, decode)
+
+
+def classify_files(files, backend="efficientnet"):
+    """Classifie une liste de (contenu, content_type, nom) en un seul batch."""
+    model, decode = get_classifier(backend)
+    results = classify_batch(
+        files, model, decode=lambda file: decode(file_to_image_bytes(*file))
+    )
+    return [{"filename": file[2], **result} for file, result in zip(files, results)]
+
+
+def check_backend(backend):
+    if backend not in CLASSIFIER_BACKENDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown backend '{backend}' (expected one of {', '.join(CLASSIFIER_BACKENDS)}).",
+        )
+
+
+@app.post("/predict/")
+async def predict(file: UploadFile = File(...), backend: str = "efficientnet"):
+    """Classifie un fichier ; `backend` choisit le modèle (efficientnet, vit, coca_vit)."""
+    check_backend(backend)
+    file_bytes = await file.read()
+    return await pool.run(
+        classify_file, file_bytes, file.content_type, file.filename, backend
+    )
+
+
+@app.post("/predict/batch")
+async def predict_batch(
+    files: List[UploadFile] = File(...), backend: str = "efficientnet"
+):
+    """
+    Classifie plusieurs fichiers en une requête : décodage en parallèle puis
+    une seule inférence par batch. Un fichier illisible donne une entrée
+    {"filename", "error"} sans faire échouer les autres.
+    """
+    check_backend(backend)
+    if len(files) > PREDICT_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many files (max {PREDICT_BATCH_MAX_FILES}).",
+        )
+    items = [(await file.read(), file.content_type, file.filename or "") for file in files]
+    return {"results": await pool.run(classify_files, items, backend)}
+
+
+def parse_point(point: str) -> Tuple[float, float]:
+    """Convertit une chaîne "x,y" en tuple de floats."""
+    x, y = map(float, point.split(","))
+    return (x, y)
+
+
+def generate_from_upload(
+    filename, file_bytes, point1, point2, real_distance_m, progress=None, profile=False
+):
+    """
+    Calcule l'échelle et génère le modèle 3D, sans écrire l'image sur disque.
+
+    La génération est tracée (durée des étapes, compteurs) ; avec `profile`
+    et PROFILE_REQUESTS=1, un profil cProfile est écrit dans PROFILE_DIR.
+    """
+    profile_dir = PROFILE_DIR if profile and PROFILE_REQUESTS else None
+    with trace(f"generate {filename}", profile_dir=profile_dir):
+        with span("scale"):
+            scale = compute_scale(
+                io.BytesIO(file_bytes),
+                point1,
+                point2,
+                real_distance_m,
+            )
+
+        glb, _ = detect_and_generate_3d(
+            filename, scale, progress=progress, image_bytes=file_bytes
+        )
+    return glb
+
+
+async def glb_response(request: Request, glb: bytes):
+    """Réponse GLB depuis la mémoire, compressée en gzip si le client l'accepte."""
+    headers = {"Vary": "Accept-Encoding"}
+    accepts_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    if GLB_GZIP_LEVEL > 0 and accepts_gzip:
+        glb = await run_in_threadpool(gzip.compress, glb, GLB_GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    return Response(glb, media_type="application/octet-stream", headers=headers)
+
+
+@app.post("/upload/")
+async def upload_image(
+    request: Request,
+    file: UploadFile = File(...),
+    point1: str = Form(...),
+    point2: str = Form(...),
+    real_distance_m: float = Form(...),
+    profile: bool = False,
+):
+    file_bytes = await file.read()
+
+    point1_tuple = parse_point(point1)
+    point2_tuple = parse_point(point2)
+
+    print("Points parsed:", point1_tuple, point2_tuple)
+
+    glb = await pool.run(
+        generate_from_upload,
+        file.filename,
+        file_bytes,
+        point1_tuple,
+        point2_tuple,
+        real_distance_m,
+        profile=profile,
+    )
+    return await glb_response(request, glb)
+
+
+@app.post("/jobs/", status_code=202)
+async def create_job(
+    file: UploadFile = File(...),
+    point1: str = Form(...),
+    point2: str = Form(...),
+    real_distance_m: float = Form(...),
+    profile: bool = False,
+):
+    """Lance la génération 3D en arrière-plan et retourne l'identifiant du job."""
+    file_bytes = await file.read()
+
+    # L'état du job est écrit sur disque : hors de la boucle d'événements
+    job = await run_in_threadpool(
+        jobs.submit,
+        generate_from_upload,
+        os.path.basename(file.filename),
+        file_bytes,
+        parse_point(point1),
+        parse_point(point2),
+        real_distance_m,
+        profile=profile,
+    )
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await run_in_threadpool(jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str, request: Request):
+    job = await run_in_threadpool(jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}.")
+    glb = await run_in_threadpool(jobs.result, job_id)
+    if glb is None:
+        raise HTTPException(status_code=410, detail="Job result expired.")
+    return await glb_response(request, glb)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    stats = {"results": result_cache.stats(), "detections": detection_cache.stats()}
+    if extrusion_pool.geometry_cache is not None:
+        stats["geometry"] = extrusion_pool.geometry_cache.stats()
+    return stats
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Prêt quand tous les modèles préchargés sont chargés (sonde de
+    disponibilité). Sans préchargement (WARMUP_MODELS vide), toujours prêt.
+    """
+    is_ready = all(status == "ready" for status in warmup_status.values())
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "models": warmup_status},
+    )
+
+
+@app.get("/metrics")
+async def metrics():
+    """Métriques au format texte Prometheus."""
+    gauges = {
+        "floorplan_worker_pending": (
+            "Requêtes en cours ou en attente dans le pool de travail.",
+            pool.pending,
+        ),
+        "floorplan_jobs_pending": ("Jobs en cours ou en attente.", jobs.queue_depth),
+    }
+    return PlainTextResponse(
+        render_metrics(gauges), media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/")
+async def root():
+    return {"message": "Hello, please upload an image to /upload/."}
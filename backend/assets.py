@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+import trimesh
+from PIL import Image
+from utils import load_mesh_safe
+from result_cache import write_atomic
+from constants import ASSET_CACHE_DIR, TEXTURE_MAX_SIZE
+from my_logger import my_logger
+
+
+class MeshInstance:
+    """
+    Placement d'un modèle partagé (porte, fenêtre) dans la scène.
+
+    Le mesh n'est jamais modifié : seule la matrice 4x4 `transform` est propre
+    à l'instance. `to_mesh` crée une copie transformée quand une géométrie
+    indépendante est vraiment nécessaire.
+    """
+
+    def __init__(self, name, mesh, transform):
+        self.name = name
+        self.mesh = mesh
+        self.transform = transform
+
+    def to_mesh(self):
+        mesh = self.mesh.copy()
+        mesh.apply_transform(self.transform)
+        mesh.visual.name = self.name
+        return mesh
+
+
+def prepare_image(image, max_size=0):
+    """
+    Réduit l'image si son plus grand côté dépasse `max_size` (0 = pas de
+    limite) et fixe son format d'export : l'exporteur glTF n'écrit en JPEG que
+    les images dont le format est "JPEG", toutes les autres partent en PNG,
+    bien plus lourd pour une photo. Les images opaques sont donc exportées en
+    JPEG, celles avec transparence restent en PNG.
+    """
+    if max_size and max(image.size) > max_size:
+        image = image.copy()
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+    if image.mode == "RGB":
+        image.format = "JPEG"
+    return image
+
+
+def prepare_materials(mesh, max_size=0):
+    """Applique prepare_image aux textures du matériau du mesh (en place)."""
+    material = getattr(mesh.visual, "material", None)
+    if material is None:
+        return mesh
+    for attribute in ("image", "baseColorTexture"):
+        image = getattr(material, attribute, None)
+        if image is not None:
+            setattr(material, attribute, prepare_image(image, max_size))
+    return mesh
+
+
+class TextureCache:
+    """
+    Cache des textures de sol.
+
+    Chaque fichier est décodé une seule fois par processus et donne un seul
+    SimpleMaterial, partagé par tous les meshes qui l'utilisent et entre les
+    requêtes. L'export GLB déduplique les matériaux identiques : chaque image
+    n'est donc écrite qu'une fois par fichier.
+    """
+
+    def __init__(self, max_size=0):
+        self.max_size = max_size
+        self._materials = {}
+        self._lock = threading.Lock()
+
+    def material(self, path):
+        """Retourne le matériau partagé de la texture `path`."""
+        stat = os.stat(path)
+        with self._lock:
+            cached = self._materials.get(path)
+            if cached is not None and cached[0] == stat.st_mtime_ns:
+                return cached[1]
+            my_logger.info(f"Chargement de la texture {path}")
+            with Image.open(path) as image:
+                image.load()
+                image = prepare_image(image, self.max_size)
+            material = trimesh.visual.texture.SimpleMaterial(image=image)
+            self._materials[path] = (stat.st_mtime_ns, material)
+            return material
+
+    def clear(self):
+        with self._lock:
+            self._materials.clear()
+
+
+class MeshAssetCache:
+    """
+    Cache des modèles 3D de mobilier (Door.obj, Window.obj, ...).
+
+    Chaque fichier est analysé une seule fois par processus. Une version GLB
+    binaire est aussi gardée dans `cache_dir`, beaucoup plus rapide à relire
+    que l'OBJ texte au démarrage suivant. Les meshes retournés sont partagés
+    entre toutes les requêtes et ne doivent pas être modifiés.
+    """
+
+    def __init__(self, cache_dir, texture_max_size=0):
+        self.cache_dir = cache_dir
+        self.texture_max_size = texture_max_size
+        self._meshes = {}
+        self._lock = threading.Lock()
+
+    def _binary_path(self, path, stat):
+        key = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(path))[0].replace(" ", "_")
+        return os.path.join(self.cache_dir, f"{name}-{digest}.glb")
+
+    def _load(self, path, stat):
+        binary_path = self._binary_path(path, stat)
+        if os.path.exists(binary_path):
+            return load_mesh_safe(binary_path)
+
+        mesh = load_mesh_safe(path)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            data = mesh.export(file_type="glb")
+            write_atomic(binary_path, lambda f: f.write(data))
+        except Exception as e:
+            my_logger.warning(f"Impossible d'enregistrer {binary_path} : {e}")
+        return mesh
+
+    def get(self, path) -> trimesh.Trimesh:
+        """Retourne le mesh partagé du fichier (chargé une seule fois)."""
+        stat = os.stat(path)
+        with self._lock:
+            cached = self._meshes.get(path)
+            if cached is not None and cached[0] == stat.st_mtime_ns:
+                return cached[1]
+            my_logger.info(f"Chargement de l'asset {path}")
+            mesh = prepare_materials(self._load(path, stat), self.texture_max_size)
+            self._meshes[path] = (stat.st_mtime_ns, mesh)
+            return mesh
+
+    def clear(self):
+        with self._lock:
+            self._meshes.clear()
+
+
+mesh_assets = MeshAssetCache(ASSET_CACHE_DIR, TEXTURE_MAX_SIZE)
+texture_assets = TextureCache(TEXTURE_MAX_SIZE)
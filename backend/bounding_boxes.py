@@ -1,7 +1,17 @@
-from shapely.geometry import box as shapely_box
-from shapely.geometry import Polygon
-import supervision as sv
+from box_index import (
+    as_boxes,
+    box_areas,
+    candidate_pairs,
+    connected_components,
+    intersection_area,
+)
+from my_logger import my_logger
 import numpy as np
+import time
+
+# Version du post-traitement des boxes : à incrémenter à chaque changement de
+# bbox_pipeline ou de ses filtres, pour invalider le cache des détections
+BBOX_PIPELINE_VERSION = 1
 
 
 def process_bbox(bounding_boxes: dict, iou_threshold: float = 0.3):
@@ -59,10 +69,21 @@ def process_bbox(bounding_boxes: dict, iou_threshold: float = 0.3):
 
 
 def merge_boxes_dict(
-    boxes_dict: dict, iou_threshold: float = 0.1, distance_threshold: int = 80
+    boxes_dict: dict,
+    iou_threshold: float = 0.1,
+    distance_threshold: int = 80,
+    transitive: bool = True,
 ):
-
-    import numpy as np
+    """
+    Fusionne les fenêtres proches ou qui se chevauchent en une seule box.
+
+    Deux boxes sont liées si leur IoU dépasse `iou_threshold`, ou si leurs
+    centres sont à moins de `distance_threshold` avec la même orientation.
+    Avec `transitive=True`, les boxes liées de proche en proche (A-B, B-C)
+    forment un seul groupe (union-find sur les paires candidates). Avec
+    `transitive=False`, on reproduit l'ancien algorithme glouton qui ne
+    compare qu'avec la première box de chaque groupe.
+    """
 
     def iou(boxA, boxB):
         xA = max(boxA[0], boxB[0])
@@ -81,7 +102,7 @@ def merge_boxes_dict(
         w2, h2 = box2[2] - box2[0], box2[3] - box2[1]
         return (w1 > h1 and w2 > h2) or (h1 >= w1 and h2 >= w2)
 
-    def merge_class_boxes(boxes):
+    def merge_class_boxes_greedy(boxes):
         boxes = [
             list(map(float, b)) for b in boxes
         ]  # Ensure all coordinates are floats
@@ -117,6 +138,43 @@ def merge_boxes_dict(
 
         return merged
 
+    def merge_class_boxes_transitive(boxes):
+        boxes = as_boxes(boxes)
+        if len(boxes) == 0:
+            return []
+
+        # Une box contient son centre : des centres à moins de distance_threshold
+        # impliquent des boxes à moins de distance_threshold l'une de l'autre.
+        i, j = candidate_pairs(boxes, boxes, margin=distance_threshold)
+        upper = i < j
+        i, j = i[upper], j[upper]
+
+        inter = intersection_area(boxes[i], boxes[j])
+        union = box_areas(boxes)[i] + box_areas(boxes)[j] - inter
+        with np.errstate(divide="ignore", invalid="ignore"):
+            iou = np.where(union > 0, inter / union, 0)
+
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        center_dist = np.linalg.norm(centers[i] - centers[j], axis=1)
+        horizontal = (boxes[:, 2] - boxes[:, 0]) > (boxes[:, 3] - boxes[:, 1])
+        same_orient = horizontal[i] == horizontal[j]
+
+        linked = (iou > iou_threshold) | ((center_dist < distance_threshold) & same_orient)
+        labels = connected_components(len(boxes), i[linked], j[linked])
+
+        merged = np.empty((labels.max() + 1, 4))
+        merged[:, :2] = np.inf
+        merged[:, 2:] = -np.inf
+        np.minimum.at(merged[:, 0], labels, boxes[:, 0])
+        np.minimum.at(merged[:, 1], labels, boxes[:, 1])
+        np.maximum.at(merged[:, 2], labels, boxes[:, 2])
+        np.maximum.at(merged[:, 3], labels, boxes[:, 3])
+        return merged.tolist()
+
+    merge_class_boxes = (
+        merge_class_boxes_transitive if transitive else merge_class_boxes_greedy
+    )
+
     # Apply merging to each category in the dictionary
     merged_dict = {}
     for key, box_list in boxes_dict.items():
@@ -127,39 +185,23 @@ def merge_boxes_dict(
     return merged_dict
 
 
-def bbox_to_polygon(bbox: list):
-    """Convertit une bounding box [xmin, ymin, xmax, ymax] en polygon Shapely."""
-    x0, y0, x1, y1 = bbox
-    return Polygon([(x0, y0), (x1, y0), (x1, y1), (x0, y1)])
-
-
 def remove_door_windows_overlapping(bbox_dict: dict):
     """Supprime les fenêtres et portes qui se chevauchent entre elles."""
     wall_bboxes = bbox_dict["wall_boxes"]
     window_bboxes = bbox_dict["window_boxes"]
     door_bboxes = bbox_dict["door_boxes"]
 
-    # Convertir en Polygones
-    wall_polygons = [bbox_to_polygon(wall) for wall in wall_bboxes]
-    window_polygons = [bbox_to_polygon(window) for window in window_bboxes]
-    door_polygons = [bbox_to_polygon(door) for door in door_bboxes]
-
-    valid_windows = []
-    valid_doors = []
+    # Paires fenêtre/porte qui se touchent (bords inclus)
+    win_idx, door_idx = candidate_pairs(as_boxes(window_bboxes), as_boxes(door_bboxes))
+    overlapping_windows = set(win_idx.tolist())
+    overlapping_doors = set(door_idx.tolist())
 
-    for i, win_poly in enumerate(window_polygons):
-        overlap_with_door = any(
-            win_poly.intersects(door_poly) for door_poly in door_polygons
-        )
-        if not overlap_with_door:
-            valid_windows.append(window_bboxes[i])
-
-    for i, door_poly in enumerate(door_polygons):
-        overlap_with_window = any(
-            door_poly.intersects(win_poly) for win_poly in window_polygons
-        )
-        if not overlap_with_window:
-            valid_doors.append(door_bboxes[i])
+    valid_windows = [
+        window for i, window in enumerate(window_bboxes) if i not in overlapping_windows
+    ]
+    valid_doors = [
+        door for i, door in enumerate(door_bboxes) if i not in overlapping_doors
+    ]
 
     number_of_doors_remove = len(door_bboxes) - len(valid_doors)
     number_of_windows_remove = len(window_bboxes) - len(valid_windows)
@@ -182,25 +224,14 @@ def remove_door_or_window_without_between_wall(bbox_dict: dict):
     door_bboxes = bbox_dict["door_boxes"]
     window_bboxes = bbox_dict["window_boxes"]
 
-    wall_polygons = [bbox_to_polygon(wall) for wall in wall_bboxes]
-    door_polygons = [bbox_to_polygon(door) for door in door_bboxes]
-    window_polygons = [bbox_to_polygon(win) for win in window_bboxes]
-
-    valid_doors = []
-    for i, door_poly in enumerate(door_polygons):
-        touches_wall = any(
-            door_poly.intersects(wall_poly) for wall_poly in wall_polygons
-        )
-        if touches_wall:
-            valid_doors.append(door_bboxes[i])
-
-    valid_windows = []
-    for i, win_poly in enumerate(window_polygons):
-        touches_wall = any(
-            win_poly.intersects(wall_poly) for wall_poly in wall_polygons
-        )
-        if touches_wall:
-            valid_windows.append(window_bboxes[i])
+    walls = as_boxes(wall_bboxes)
+    doors_touching = set(candidate_pairs(as_boxes(door_bboxes), walls)[0].tolist())
+    windows_touching = set(candidate_pairs(as_boxes(window_bboxes), walls)[0].tolist())
+
+    valid_doors = [door for i, door in enumerate(door_bboxes) if i in doors_touching]
+    valid_windows = [
+        window for i, window in enumerate(window_bboxes) if i in windows_touching
+    ]
 
     number_of_doors_remove = len(door_bboxes) - len(valid_doors)
     number_of_windows_remove = len(window_bboxes) - len(valid_windows)
@@ -218,9 +249,6 @@ def remove_door_or_window_without_between_wall(bbox_dict: dict):
     }
 
 
-from shapely.geometry import box as shapely_box
-
-
 def remove_door_windows_not_in_wall(bbox: dict, iou_threshold: float = 1e-2):
     """
     Supprime les portes et fenêtres qui ne sont pas du tout placées sur un mur
@@ -234,28 +262,28 @@ def remove_door_windows_not_in_wall(bbox: dict, iou_threshold: float = 1e-2):
         dict : bbox mis à jour
     """
 
-    def has_overlap(candidate_bbox, wall_bboxes):
-        c_box = shapely_box(*candidate_bbox)
-        for wall_bbox in wall_bboxes:
-            w_box = shapely_box(*wall_bbox)
-            inter_area = c_box.intersection(w_box).area
-            union_area = c_box.union(w_box).area
-            if union_area > 0 and (inter_area / union_area) > iou_threshold:
-                return True
-        return False
-
-    wall_bboxes = bbox.get("wall_boxes", [])
-    original_door_count = len(bbox.get("door_boxes", []))
-    original_window_count = len(bbox.get("window_boxes", []))
-
-    bbox["door_boxes"] = [
-        door for door in bbox.get("door_boxes", []) if has_overlap(door, wall_bboxes)
-    ]
-
+    walls = as_boxes(bbox.get("wall_boxes", []))
+
+    def overlapping(candidate_bboxes):
+        """Indices des boxes dont l'IoU avec au moins un mur dépasse le seuil."""
+        candidates = as_boxes(candidate_bboxes)
+        i, j = candidate_pairs(candidates, walls)
+        inter_area = intersection_area(candidates[i], walls[j])
+        union_area = box_areas(candidates)[i] + box_areas(walls)[j] - inter_area
+        with np.errstate(divide="ignore", invalid="ignore"):
+            valid = (union_area > 0) & (inter_area / union_area > iou_threshold)
+        return set(i[valid].tolist())
+
+    door_bboxes = bbox.get("door_boxes", [])
+    window_bboxes = bbox.get("window_boxes", [])
+    original_door_count = len(door_bboxes)
+    original_window_count = len(window_bboxes)
+
+    valid_doors = overlapping(door_bboxes)
+    valid_windows = overlapping(window_bboxes)
+    bbox["door_boxes"] = [door for i, door in enumerate(door_bboxes) if i in valid_doors]
     bbox["window_boxes"] = [
-        window
-        for window in bbox.get("window_boxes", [])
-        if has_overlap(window, wall_bboxes)
+        window for i, window in enumerate(window_bboxes) if i in valid_windows
     ]
 
     print(
@@ -275,24 +303,20 @@ def remove_alone_walls_not_attached_to_another_wall(
     :return: bbox mis à jour avec les murs seuls supprimés
     """
     wall_boxes = bbox["wall_boxes"]
-    kept_walls = []
+    walls = as_boxes(wall_boxes)
 
-    for i, box_i in enumerate(wall_boxes):
-        poly_i = shapely_box(*box_i)
-        attached = False
-
-        for j, box_j in enumerate(wall_boxes):
-            if i == j:
-                continue
-            poly_j = shapely_box(*box_j)
-            if (
-                poly_i.intersects(poly_j)
-                or poly_i.distance(poly_j) < distance_threshold
-            ):
-                attached = True
-                break
-
-        if attached:
+    # Paires de murs proches (boxes agrandies du seuil), puis distance exacte
+    i, j = candidate_pairs(walls, walls, margin=distance_threshold)
+    others = i != j
+    i, j = i[others], j[others]
+    dx = np.maximum(0, np.maximum(walls[j, 0] - walls[i, 2], walls[i, 0] - walls[j, 2]))
+    dy = np.maximum(0, np.maximum(walls[j, 1] - walls[i, 3], walls[i, 1] - walls[j, 3]))
+    distance = np.hypot(dx, dy)
+    attached = set(i[(distance == 0) | (distance < distance_threshold)].tolist())
+
+    kept_walls = []
+    for idx, box_i in enumerate(wall_boxes):
+        if idx in attached:
             kept_walls.append(box_i)
         else:
             print(f"Removed isolated wall: {box_i}")
@@ -301,13 +325,29 @@ def remove_alone_walls_not_attached_to_another_wall(
     return bbox
 
 
-def apply_bbox_pipeline(bbox: list, steps: list):
+def apply_bbox_pipeline(bbox: list, steps: list, timings: dict = None):
+    """
+    Applique les étapes dans l'ordre. Si `timings` est fourni, il reçoit la
+    durée (en secondes) de chaque étape, indexée par le nom de la fonction.
+    """
     for func in steps:
+        start = time.perf_counter()
         bbox = func(bbox)
+        if timings is not None:
+            timings[func.__name__] = time.perf_counter() - start
     return bbox
 
 
-def bbox_pipeline(detections: sv.Detections):
+def format_timings(timings: dict) -> str:
+    """Rapport lisible des durées par étape."""
+    lines = [f"  {name:<50} {duration * 1000:8.2f} ms" for name, duration in timings.items()]
+    lines.append(f"  {'total':<50} {sum(timings.values()) * 1000:8.2f} ms")
+    return "\n".join(lines)
+
+
+def bbox_pipeline(detections: "sv.Detections", timings: dict = None):
+    import supervision as sv
+
     pipeline = [
         # process_bbox,
         merge_boxes_dict,
@@ -323,7 +363,10 @@ def bbox_pipeline(detections: sv.Detections):
         "window_boxes": detections.xyxy[detections.class_id == 3].tolist(),
     }
 
-    bbox = apply_bbox_pipeline(bbox, pipeline)
+    if timings is None:
+        timings = {}
+    bbox = apply_bbox_pipeline(bbox, pipeline, timings)
+    my_logger.info("Durée des étapes de bbox_pipeline :\n" + format_timings(timings))
 
     # bbox = scale_bbox(bbox, scale)
 
@@ -0,0 +1,116 @@
+import numpy as np
+import shapely
+
+# Au-delà de ce nombre de paires, on passe par un STRtree plutôt qu'une matrice dense
+DENSE_MAX_PAIRS = 250_000
+
+
+def as_boxes(boxes):
+    """Convertit une liste de bounding boxes [x0, y0, x1, y1] en tableau NumPy (n, 4)."""
+    return np.asarray(boxes, dtype=float).reshape(-1, 4)
+
+
+def box_areas(boxes):
+    return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+
+def intersection_area(a, b):
+    """
+    Aire d'intersection entre les boxes a[i] et b[i] (même forme, ou diffusables).
+    Équivalent à shapely_box(*a).intersection(shapely_box(*b)).area.
+    """
+    w = np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0])
+    h = np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1])
+    return np.maximum(w, 0) * np.maximum(h, 0)
+
+
+def pairwise_intersection_area(a, b):
+    """Matrice (len(a), len(b)) des aires d'intersection."""
+    return intersection_area(a[:, None, :], b[None, :, :])
+
+
+def candidate_pairs(a, b, margin=0.0, dense_max_pairs=DENSE_MAX_PAIRS):
+    """
+    Retourne les indices (i, j) des paires de boxes a[i], b[j] qui se touchent
+    une fois agrandies de `margin` (bords inclus).
+
+    Pour les petits ensembles, une matrice dense est calculée ; au-delà de
+    `dense_max_pairs` paires, un STRtree sur b limite les comparaisons.
+    """
+    if len(a) == 0 or len(b) == 0:
+        empty = np.empty(0, dtype=int)
+        return empty, empty
+
+    if len(a) * len(b) <= dense_max_pairs:
+        close = (
+            (a[:, None, 0] <= b[None, :, 2] + margin)
+            & (b[None, :, 0] <= a[:, None, 2] + margin)
+            & (a[:, None, 1] <= b[None, :, 3] + margin)
+            & (b[None, :, 1] <= a[:, None, 3] + margin)
+        )
+        return np.nonzero(close)
+
+    tree = shapely.STRtree(shapely.box(*b.T))
+    query = shapely.box(
+        a[:, 0] - margin, a[:, 1] - margin, a[:, 2] + margin, a[:, 3] + margin
+    )
+    i, j = tree.query(query, predicate="intersects")
+    order = np.lexsort((j, i))
+    return i[order], j[order]
+
+
+def best_overlap_match(elements, walls, dense_max_pairs=DENSE_MAX_PAIRS):
+    """
+    Pour chaque élément (porte ou fenêtre), indice du mur avec la plus grande
+    aire d'intersection, ou -1 si aucun mur ne le chevauche.
+    En cas d'égalité, le mur de plus petit indice est retenu.
+    """
+    elements = as_boxes(elements)
+    walls = as_boxes(walls)
+    best = np.full(len(elements), -1, dtype=int)
+    if len(elements) == 0 or len(walls) == 0:
+        return best
+
+    if len(elements) * len(walls) <= dense_max_pairs:
+        areas = pairwise_intersection_area(elements, walls)
+        idx = areas.argmax(axis=1)
+        found = areas[np.arange(len(elements)), idx] > 0
+        best[found] = idx[found]
+        return best
+
+    i, j = candidate_pairs(elements, walls, dense_max_pairs=dense_max_pairs)
+    areas = intersection_area(elements[i], walls[j])
+    keep = areas > 0
+    i, j, areas = i[keep], j[keep], areas[keep]
+    # Trier par élément, puis aire décroissante, puis indice de mur croissant
+    order = np.lexsort((j, -areas, i))
+    i, j = i[order], j[order]
+    first = np.ones(len(i), dtype=bool)
+    first[1:] = i[1:] != i[:-1]
+    best[i[first]] = j[first]
+    return best
+
+
+def connected_components(n, i, j):
+    """
+    Étiquette de composante (union-find) pour n noeuds reliés par les arêtes (i, j).
+    Les étiquettes sont numérotées dans l'ordre du premier noeud de chaque composante.
+    """
+    parent = list(range(n))
+
+    def find(x):
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    for a, b in zip(i.tolist(), j.tolist()):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    roots = np.array([find(x) for x in range(n)], dtype=int)
+    _, labels = np.unique(roots, return_inverse=True)
+    return labels
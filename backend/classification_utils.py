@@ -1,11 +1,8 @@
-from ezdxf.addons.drawing import Frontend, RenderContext, layout, pymupdf, config
 import subprocess
 import tempfile
-import ezdxf
-from cairosvg import svg2png
 
 
-async def svg_to_png(svg_byte: bytes) -> bytes:
+def svg_to_png(svg_byte: bytes) -> bytes:
     """Convertit un fichier SVG en PNG avec ImageMagick."""
     with tempfile.NamedTemporaryFile(suffix=".svg", delete=False) as svg_temp:
         svg_temp.write(svg_byte)
@@ -22,8 +19,10 @@ async def svg_to_png(svg_byte: bytes) -> bytes:
     return png_data
 
 
-async def cairosvg(svg_bytes: bytes) -> bytes:
+def cairosvg(svg_bytes: bytes) -> bytes:
     """Convertit un fichier SVG en PNG avec CairoSVG."""
+    from cairosvg import svg2png
+
     with tempfile.NamedTemporaryFile(suffix=".svg", delete=False) as svg_temp:
         svg_temp.write(svg_bytes)
         svg_temp.flush()
@@ -39,8 +38,11 @@ async def cairosvg(svg_bytes: bytes) -> bytes:
     return png_data
 
 
-async def dxf_to_png(dxf_bytes: bytes) -> bytes:
+def dxf_to_png(dxf_bytes: bytes) -> bytes:
     """Convertit un fichier DXF en PNG."""
+    import ezdxf
+    from ezdxf.addons.drawing import Frontend, RenderContext, layout, pymupdf, config
+
     with tempfile.NamedTemporaryFile(suffix=".dxf", delete=False) as dxf_temp:
         dxf_temp.write(dxf_bytes)
         dxf_temp.flush()
@@ -7,14 +7,101 @@ CHECKPOINTS = "./checkpoints"
 TEXTURES_FOLDER = "./textures"
 OBJ_MODELS = "./3D_models"
 
+# Micro-batching de la détection RFDETR
+DETECTION_MAX_BATCH_SIZE = int(os.environ.get("DETECTION_MAX_BATCH_SIZE", 4))
+DETECTION_MAX_WAIT_MS = float(os.environ.get("DETECTION_MAX_WAIT_MS", 20))
+
+# Classification des plans (/predict/ et /predict/batch)
+CLASSIFY_MAX_BATCH_SIZE = int(os.environ.get("CLASSIFY_MAX_BATCH_SIZE", 16))
+CLASSIFY_DECODE_THREADS = int(os.environ.get("CLASSIFY_DECODE_THREADS", 4))
+PREDICT_BATCH_MAX_FILES = int(os.environ.get("PREDICT_BATCH_MAX_FILES", 64))
+
+# Modèles chargés en arrière-plan au démarrage (vit et coca_vit sont chargés
+# à leur premier usage, sauf s'ils sont ajoutés ici)
+WARMUP_MODELS = [
+    name
+    for name in os.environ.get("WARMUP_MODELS", "rfdetr,classifier").split(",")
+    if name
+]
+
+# Pool de travail pour les traitements lourds des endpoints
+WORKER_THREADS = int(os.environ.get("WORKER_THREADS", 2))
+WORKER_QUEUE_SIZE = int(os.environ.get("WORKER_QUEUE_SIZE", 8))
+
+# File de jobs de génération 3D (API asynchrone /jobs/)
+JOB_CONCURRENCY = int(os.environ.get("JOB_CONCURRENCY", 1))
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", 32))
+JOB_TTL_SECONDS = int(os.environ.get("JOB_TTL_SECONDS", 3600))
+# Jobs jamais terminés (processus arrêté en cours de job) oubliés après ce délai
+JOB_TIMEOUT_SECONDS = int(os.environ.get("JOB_TIMEOUT_SECONDS", 86400))
+# État et résultats des jobs, partagés par tous les processus uvicorn (--workers)
+JOB_DIR = os.environ.get("JOB_DIR", "./outputs/jobs")
+JOB_RESULTS_MAX_MB = float(os.environ.get("JOB_RESULTS_MAX_MB", 256))
+
+# Cache des modèles GLB générés
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR", "./outputs/cache")
+RESULT_CACHE_MAX_MB = float(os.environ.get("RESULT_CACHE_MAX_MB", 512))
+
+# Cache des détections (bounding boxes après bbox_pipeline)
+DETECTION_CACHE_DIR = os.environ.get("DETECTION_CACHE_DIR", "./outputs/detections")
+DETECTION_CACHE_MAX_MB = float(os.environ.get("DETECTION_CACHE_MAX_MB", 64))
+
+# Cache disque des extrusions triangulées (murs des découpes booléennes, sols),
+# 0 = désactivé
+GEOMETRY_CACHE_DIR = os.environ.get("GEOMETRY_CACHE_DIR", "./outputs/geometry")
+GEOMETRY_CACHE_MAX_MB = float(os.environ.get("GEOMETRY_CACHE_MAX_MB", 256))
+
+# Les fichiers de uploads/ et outputs/ (hors caches) plus vieux que
+# CLEANUP_MAX_AGE_HOURS sont supprimés toutes les CLEANUP_INTERVAL_SECONDS, 0 = jamais
+CLEANUP_DIRS = os.environ.get("CLEANUP_DIRS", "./uploads,./outputs").split(",")
+CLEANUP_MAX_AGE_HOURS = float(os.environ.get("CLEANUP_MAX_AGE_HOURS", 24))
+CLEANUP_INTERVAL_SECONDS = float(os.environ.get("CLEANUP_INTERVAL_SECONDS", 3600))
+
+# Compression gzip des GLB envoyés aux clients qui l'acceptent (niveau 1-9), 0 = désactivée
+GLB_GZIP_LEVEL = int(os.environ.get("GLB_GZIP_LEVEL", 6))
+
+# Profil cProfile par requête (paramètre ?profile=true), seulement si PROFILE_REQUESTS=1
+PROFILE_REQUESTS = os.environ.get("PROFILE_REQUESTS", "0") == "1"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "./outputs/profiles")
+
+# Version binaire (GLB) des modèles de portes et fenêtres
+ASSET_CACHE_DIR = os.environ.get("ASSET_CACHE_DIR", "./outputs/assets")
+
+# Taille maximale (en pixels, plus grand côté) des textures exportées, 0 = pas de limite
+TEXTURE_MAX_SIZE = int(os.environ.get("TEXTURE_MAX_SIZE", 0))
+
+# Extrusion des polygones (murs, sols) sur plusieurs processus : nombre de
+# processus (0 = nombre de coeurs) et nombre total de sommets à partir duquel
+# le pool est utilisé. Il sert aux sols et aux murs des découpes booléennes
+# (cut_mode "single", par défaut, et "per_component") ; en cut_mode
+# "analytic", seuls les murs repassés en découpe booléenne l'utilisent,
+# analytic_cut tourne dans le processus appelant.
+EXTRUDE_PROCESSES = int(os.environ.get("EXTRUDE_PROCESSES", 0))
+EXTRUDE_PARALLEL_MIN_VERTICES = int(
+    os.environ.get("EXTRUDE_PARALLEL_MIN_VERTICES", 20000)
+)
+
+# Découpe analytique des ouvertures (cut_mode="analytic") : un polygone n'y
+# passe que si sa grille a au plus ce nombre de cellules par sommet du
+# polygone et coin de cutter, sinon la découpe booléenne est plus rapide
+ANALYTIC_CUT_MAX_CELL_RATIO = float(os.environ.get("ANALYTIC_CUT_MAX_CELL_RATIO", 10))
+
 paths.extend([DATASET, CHECKPOINTS, TEXTURES_FOLDER, OBJ_MODELS])
 
-for path in paths:
-    if os.path.exists(path):
-        # print(f"✅ {path} exist")
-        my_logger.info(f"✅ {path} exist")
-    else:
-        raise RuntimeError(f"{path} does not exist")
+
+def check_paths():
+    """
+    Vérifie que les dossiers de données existent (au démarrage du serveur,
+    pas à l'import, pour ne pas ralentir les scripts et les processus de travail).
+    """
+    for path in paths:
+        if os.path.exists(path):
+            # print(f"✅ {path} exist")
+            my_logger.info(f"✅ {path} exist")
+        else:
+            raise RuntimeError(f"{path} does not exist")
+
+
 # print(DATASET, CHECKPOINTS, TEXTURES_FOLDER)
 # print("✅ Code executed with success")
 # my_logger.info("✅ Code executed with success")
@@ -1,37 +1,153 @@
-from rfdetr_detection import rfdetr_locally_detection
-from constants import OBJ_MODELS, TEXTURES_FOLDER
-from bounding_boxes import bbox_pipeline
+import io
+from rfdetr_detection import (
+    rfdetr_locally_detection,
+    RFDETR_CHECKPOINT,
+    DETECTION_THRESHOLD,
+)
+from constants import (
+    OBJ_MODELS,
+    TEXTURES_FOLDER,
+    RESULT_CACHE_DIR,
+    RESULT_CACHE_MAX_MB,
+    DETECTION_CACHE_DIR,
+    DETECTION_CACHE_MAX_MB,
+    TEXTURE_MAX_SIZE,
+)
+from bounding_boxes import bbox_pipeline, BBOX_PIPELINE_VERSION
 from walls import generate_wall_polygon_from_bbox
 from utils import process_polygons
 from generate_model import generate_3d_model_from_polygons
+from result_cache import ResultCache, DetectionCache, file_signature
+from tracing import count, span, stage
 from my_logger import my_logger
-import os
 
-def detect_and_generate_3d(image_path: str, scale: float):
-    my_logger.info(f"Image path: {image_path}")
+result_cache = ResultCache(RESULT_CACHE_DIR, max_bytes=RESULT_CACHE_MAX_MB * 1024**2)
+detection_cache = DetectionCache(
+    DETECTION_CACHE_DIR, max_bytes=DETECTION_CACHE_MAX_MB * 1024**2
+)
+
+
+def detect_bboxes(image_bytes: bytes, progress=None):
+    """
+    Retourne les boxes des murs, portes et fenêtres après `bbox_pipeline`.
+
+    Le résultat ne dépend pas de l'échelle et est mis en cache par image :
+    un changement de calibration ne relance pas la détection.
+    """
+    cache_key = DetectionCache.make_key(
+        image_bytes,
+        {
+            "checkpoint": file_signature(RFDETR_CHECKPOINT),
+            "threshold": DETECTION_THRESHOLD,
+            "pipeline": BBOX_PIPELINE_VERSION,
+        },
+    )
+    bbox = detection_cache.load(cache_key)
+    if bbox is not None:
+        my_logger.info("Détections trouvées dans le cache.")
+        return bbox
+
+    with stage("detection", progress):
+        detections, _ = rfdetr_locally_detection(io.BytesIO(image_bytes))
+    count("detections", len(detections))
+
+    with stage("bbox_pipeline", progress):
+        bbox = bbox_pipeline(detections)
+
+    detection_cache.store(cache_key, bbox)
+    return bbox
+
 
-    detections, _ = rfdetr_locally_detection(image_path)
-    bbox = bbox_pipeline(detections)
+def detect_and_generate_3d(
+    image_path: str, scale: float, progress=None, image_bytes: bytes = None
+):
+    """
+    Détecte les éléments du plan puis génère le modèle 3D au format GLB.
+
+    Le GLB est exporté en mémoire ; il n'est écrit sur disque que par le
+    cache de résultats. Si le même plan a déjà été généré avec la même
+    échelle et les mêmes paramètres, le GLB en cache est retourné directement
+    (la scène vaut alors None).
+
+    Args:
+        image_path (str): Chemin (ou nom) de l'image du plan.
+        scale (float): Échelle en mètres par pixel.
+        progress (callable): Appelée avec le nom de chaque étape au moment où elle commence.
+        image_bytes (bytes): Contenu de l'image ; s'il est donné, image_path
+            n'est pas lu.
+
+    Returns:
+        tuple: (contenu du GLB en bytes, trimesh.Scene ou None)
+    """
+    my_logger.info(f"Image path: {image_path}")
 
     door_path = f"{OBJ_MODELS}/Door.obj"
     window_path = f"{OBJ_MODELS}/Window.obj"
     textures = [f"{TEXTURES_FOLDER}/WoodFloor039.jpg"]
     # textures = [f"{TEXTURES_FOLDER}/carpet.jpg", f"{TEXTURES_FOLDER}/woodFloor.jpg", f"{TEXTURES_FOLDER}/WoodFloor039.jpg"]
+    wall_height = 240
+    opening_scale = 0.6
+    # Options de génération : elles changent le GLB et font donc partie de la clé.
+    # Découpe booléenne : les murs détectés ne sont pas alignés sur une grille
+    # et la découpe analytique y est plus lente (benchmarks/bench_openings.py)
+    cut_mode = "single"
+    merge_mode = "floors"
+    instancing = True
 
-    wall_polygon = generate_wall_polygon_from_bbox(bbox["wall_boxes"])
-    polygons = process_polygons(wall_polygon)
+    if image_bytes is None:
+        with open(image_path, "rb") as f:
+            image_bytes = f.read()
 
-    os.makedirs("outputs", exist_ok=True)
-    output_path = f"outputs/{image_path.split('/')[-1].split('.')[0]}.glb"
-    mesh = generate_3d_model_from_polygons(
+    cache_key = ResultCache.make_key(
+        image_bytes,
+        scale,
+        {
+            "wall_height": wall_height,
+            "opening_scale": opening_scale,
+            "door": file_signature(door_path),
+            "window": file_signature(window_path),
+            "textures": [file_signature(path) for path in textures],
+            "texture_max_size": TEXTURE_MAX_SIZE,
+            "cut_mode": cut_mode,
+            "merge_mode": merge_mode,
+            "instancing": instancing,
+        },
+    )
+    cached = result_cache.load_bytes(cache_key)
+    if cached is not None:
+        my_logger.info(f"Modèle trouvé dans le cache : {cache_key}")
+        count("output_bytes", len(cached))
+        return cached, None
+
+    bbox = detect_bboxes(image_bytes, progress=progress)
+    for key, boxes in bbox.items():
+        count(key, len(boxes))
+
+    with span("wall_union"):
+        wall_polygon = generate_wall_polygon_from_bbox(bbox["wall_boxes"])
+        polygons = process_polygons(wall_polygon)
+
+    scene = generate_3d_model_from_polygons(
         wall_polygons=polygons,
         wall_bboxes=bbox["wall_boxes"],
-        door_data=(door_path, bbox["door_boxes"], scale * 0.6),
-        window_data=(window_path, bbox["window_boxes"], scale * 0.6),
+        door_data=(door_path, bbox["door_boxes"], scale * opening_scale),
+        window_data=(window_path, bbox["window_boxes"], scale * opening_scale),
         floor_textures=textures,
-        output_path=output_path,
+        output_path=None,
         real_world_scale=scale,
-        wall_height=240,
+        wall_height=wall_height,
         image_path=image_path,
+        progress=progress,
+        instancing=instancing,
+        cut_mode=cut_mode,
+        merge_mode=merge_mode,
     )
-    return output_path, mesh
+    with span("glb_export"):
+        glb = scene.export(file_type="glb")
+    count("output_bytes", len(glb))
+
+    try:
+        result_cache.store_bytes(cache_key, glb)
+    except OSError as e:
+        my_logger.warning(f"Impossible d'enregistrer le modèle dans le cache : {e}")
+    return glb, scene
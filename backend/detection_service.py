@@ -0,0 +1,82 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from my_logger import my_logger
+
+
+class DetectionBatcher:
+    """
+    Regroupe les demandes de détection concurrentes en micro-batchs.
+
+    Chaque appel à `predict` dépose une image dans une file. Un thread unique
+    attend au plus `max_wait_ms` après la première image pour remplir un
+    batch d'au plus `max_batch_size` images, lance une seule prédiction sur
+    tout le batch, puis rend à chaque appelant ses propres `sv.Detections`.
+    """
+
+    def __init__(self, get_model, max_batch_size=4, max_wait_ms=20, threshold=0.4):
+        """
+        Args:
+            get_model (callable): Fonction qui retourne le modèle (ex: registry.get).
+            max_batch_size (int): Nombre maximum d'images par passe.
+            max_wait_ms (float): Temps maximum d'attente pour remplir un batch.
+            threshold (float): Seuil de confiance passé à `model.predict`.
+        """
+        self.get_model = get_model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max_wait_ms / 1000
+        self.threshold = threshold
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="detection-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, image):
+        """Ajoute une image PIL à la file et retourne un Future de ses détections."""
+        future = Future()
+        self._ensure_started()
+        self._queue.put((image, future))
+        return future
+
+    def predict(self, image):
+        """Retourne les détections d'une image (bloquant)."""
+        return self.submit(image).result()
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            images = [image for image, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                model = self.get_model()
+                detections = model.predict(images, threshold=self.threshold)
+                # RFDETR retourne un seul objet quand le batch ne contient qu'une image
+                if not isinstance(detections, list):
+                    detections = [detections]
+                my_logger.info(f"Détection sur un batch de {len(images)} image(s)")
+                for future, result in zip(futures, detections):
+                    future.set_result(result)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
@@ -1,5 +1,7 @@
 import trimesh
-from utils import load_mesh_safe, find_best_wall_by_intersection
+from utils import find_best_walls
+from assets import mesh_assets, MeshInstance
+from openings import cut_openings
 import numpy as np
 
 
@@ -14,8 +16,12 @@ def generate_door_cut_or_instance(
     mode,
     wall_bbox,
 ):
-    """Génère un box pour découper ou une instance de porte à placer."""
-    door_model = door_model.copy()
+    """
+    Génère un box pour découper ou la matrice de placement d'une porte.
+
+    En mode "instance", le modèle partagé n'est pas copié : on retourne la
+    transformation 4x4 (échelle, rotation, translation) à lui appliquer.
+    """
 
     # Calculs de base
     x_center = ((x_min + x_max) / 2) * real_world_scale
@@ -52,40 +58,36 @@ def generate_door_cut_or_instance(
         return box
 
     elif mode == "instance":
-        door_instance = door_model.copy()
-        door_instance.apply_scale(door_scale)
+        transform = trimesh.transformations.scale_matrix(door_scale)
         if is_vertical:
-            door_instance.apply_transform(
+            transform = (
                 trimesh.transformations.rotation_matrix(np.radians(90), [0, 0, 1])
+                @ transform
             )
-        door_instance.apply_translation((x_center, -y_center, 0.01))
-        return door_instance
+        transform = (
+            trimesh.transformations.translation_matrix((x_center, -y_center, 0.01))
+            @ transform
+        )
+        return transform
 
 
-def cut_and_place_doors(
-    wall_mesh,
-    door_path,
-    doors_bbox,
-    wall_bboxes,
-    door_scale,
-    real_world_scale,
-    image_path,
-):
-    """Découpe les murs et place les portes à partir des bbox de portes et murs."""
-    door_model = load_mesh_safe(door_path)
+def place_doors(door_path, doors_bbox, wall_bboxes, door_scale, real_world_scale):
+    """
+    Calcule les boxes de découpe et les instances des portes, sans toucher aux murs.
+
+    Returns:
+        tuple: (boxes de découpe, instances de portes)
+    """
+    door_model = mesh_assets.get(door_path)
 
     cut_boxes = []
     placed_doors = []
 
+    # Associer chaque porte à son mur en une seule passe
+    wall_indices = find_best_walls(doors_bbox, wall_bboxes)
+
     for i, door_bbox in enumerate(doors_bbox):
-        # wall_idx = find_corresponding_wall_bbox(door_bbox, wall_bboxes)
-        wall_idx = find_best_wall_by_intersection(
-            door_bbox,
-            wall_bboxes,
-            element_type="door",
-            image_path=image_path,
-            visualize=False,
-        )
+        wall_idx = wall_indices[i]
         wall_bbox = wall_bboxes[wall_idx] if wall_idx is not None else None
 
         # Générer la box de découpe
@@ -99,8 +101,8 @@ def cut_and_place_doors(
         )
         cut_boxes.append(box_cut)
 
-        # Générer l'instance porte
-        door_instance = generate_door_cut_or_instance(
+        # Générer l'instance porte (modèle partagé + transformation)
+        door_transform = generate_door_cut_or_instance(
             *door_bbox,
             door_model,
             door_scale,
@@ -108,13 +110,23 @@ def cut_and_place_doors(
             mode="instance",
             wall_bbox=wall_bbox,
         )
-        door_instance.visual.name = f"Door_{i}"
-        placed_doors.append(door_instance)
+        placed_doors.append(MeshInstance(f"Door_{i}", door_model, door_transform))
 
-    if cut_boxes:
-        cut_union = trimesh.util.concatenate(cut_boxes)
-        wall_mesh = trimesh.boolean.boolean_manifold(
-            [wall_mesh, cut_union], operation="difference", check_volume=False
-        )
+    return cut_boxes, placed_doors
 
+
+def cut_and_place_doors(
+    wall_mesh,
+    door_path,
+    doors_bbox,
+    wall_bboxes,
+    door_scale,
+    real_world_scale,
+    image_path,
+):
+    """Découpe les murs et place les portes à partir des bbox de portes et murs."""
+    cut_boxes, placed_doors = place_doors(
+        door_path, doors_bbox, wall_bboxes, door_scale, real_world_scale
+    )
+    wall_mesh = cut_openings(wall_mesh, cut_boxes)
     return wall_mesh, placed_doors
@@ -0,0 +1,148 @@
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import shapely
+import trimesh
+from walls import extrude_polygon, extrude_arrays
+from result_cache import GeometryCache
+from constants import (
+    EXTRUDE_PROCESSES,
+    EXTRUDE_PARALLEL_MIN_VERTICES,
+    GEOMETRY_CACHE_DIR,
+    GEOMETRY_CACHE_MAX_MB,
+)
+from my_logger import my_logger
+
+geometry_cache = (
+    GeometryCache(GEOMETRY_CACHE_DIR, max_bytes=GEOMETRY_CACHE_MAX_MB * 1024**2)
+    if GEOMETRY_CACHE_MAX_MB > 0
+    else None
+)
+
+_executor = None
+_executor_size = 0
+_lock = threading.Lock()
+
+
+def process_count():
+    return EXTRUDE_PROCESSES or os.cpu_count() or 1
+
+
+def get_executor(processes):
+    """
+    Pool de processus partagé, créé à la première extrusion parallèle (et
+    recréé si un autre nombre de processus est demandé).
+
+    Les processus sont lancés en "spawn" : le serveur a déjà des threads
+    (WorkerPool, DetectionBatcher) qu'un fork copierait dans un état incohérent.
+    """
+    global _executor, _executor_size
+    with _lock:
+        if _executor is not None and _executor_size != processes:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+        if _executor is None:
+            my_logger.info(f"Démarrage du pool d'extrusion ({processes} processus)")
+            _executor = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _executor_size = processes
+        return _executor
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def extrude_polygons(
+    polygons,
+    height,
+    engine="triangle",
+    processes=None,
+    min_vertices=None,
+    use_cache=True,
+):
+    """
+    Extrude chaque polygone à la hauteur donnée (voir walls.extrude_polygon).
+
+    Retourne une liste dans l'ordre des polygones, contenant pour chacun le
+    mesh ou l'exception levée par l'extrusion. Les empreintes déjà extrudées
+    sont relues depuis `geometry_cache` ; les autres sont triangulées par
+    `extrude_uncached` puis ajoutées au cache.
+    """
+    polygons = list(polygons)
+    if not use_cache or geometry_cache is None or not polygons:
+        return extrude_uncached(polygons, height, engine, processes, min_vertices)
+
+    keys = geometry_cache.make_keys(polygons, height, engine)
+    results = [None] * len(polygons)
+    missing = []
+    for idx, key in enumerate(keys):
+        cached = geometry_cache.load(key)
+        if cached is None:
+            missing.append(idx)
+        else:
+            vertices, faces = cached
+            results[idx] = trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+
+    computed = extrude_uncached(
+        [polygons[idx] for idx in missing], height, engine, processes, min_vertices
+    )
+    entries = []
+    for idx, mesh in zip(missing, computed):
+        results[idx] = mesh
+        if not isinstance(mesh, Exception):
+            entries.append((keys[idx], mesh.vertices, mesh.faces))
+
+    try:
+        geometry_cache.store_all(entries)
+    except OSError as e:
+        my_logger.warning(f"Impossible d'enregistrer le cache de géométrie : {e}")
+    return results
+
+
+def extrude_uncached(polygons, height, engine="triangle", processes=None, min_vertices=None):
+    """
+    Extrusion sans cache. Au-delà de `min_vertices` sommets au total (et avec
+    plusieurs processus disponibles), les triangulations sont réparties sur le
+    pool de processus ; sinon elles sont faites ici, l'une après l'autre.
+    """
+    processes = process_count() if processes is None else processes
+    if min_vertices is None:
+        min_vertices = EXTRUDE_PARALLEL_MIN_VERTICES
+
+    vertices = int(shapely.get_num_coordinates(polygons).sum()) if polygons else 0
+    if processes <= 1 or len(polygons) < 2 or vertices < min_vertices:
+        results = []
+        for polygon in polygons:
+            try:
+                results.append(extrude_polygon(polygon, height, engine))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    # Quelques paquets par processus pour équilibrer sans trop de transferts
+    chunksize = max(1, math.ceil(len(polygons) / (processes * 4)))
+    arrays = get_executor(processes).map(
+        extrude_arrays,
+        polygons,
+        [height] * len(polygons),
+        [engine] * len(polygons),
+        chunksize=chunksize,
+    )
+
+    results = []
+    for result in arrays:
+        if isinstance(result, Exception):
+            results.append(result)
+        else:
+            vertices, faces = result
+            results.append(trimesh.Trimesh(vertices=vertices, faces=faces, process=False))
+    return results
@@ -1,77 +1,180 @@
-import open_clip
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi import FastAPI, File, UploadFile
-import torchvision.transforms as T
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from PIL import Image
-from constants import CHECKPOINTS
-import torch
+from constants import CHECKPOINTS, CLASSIFY_MAX_BATCH_SIZE, CLASSIFY_DECODE_THREADS
+from model_registry import registry
 import io
 
+# torch, torchvision et open_clip ne sont importés qu'à la première
+# classification : le serveur démarre sans les charger.
 
-# Load the model
-model_path = f"{CHECKPOINTS}/Best_EfficientNet_B0.pt"
-model = torch.load(model_path, weights_only=False)
-model.eval()
+CLASSIFIER_CHECKPOINT = f"{CHECKPOINTS}/Best_EfficientNet_B0.pt"
+
+
+def load_classifier():
+    """Charge le classifieur EfficientNet (plan / autre)."""
+    import torch
+
+    model = torch.load(CLASSIFIER_CHECKPOINT, weights_only=False)
+    model.eval()
+    return model
+
+
+registry.register("classifier", load_classifier, checkpoint_path=CLASSIFIER_CHECKPOINT)
 
 classes = ["other", "floor plan"]  # For all models except Roboflow2+random.pt
 # classes = ["floor plan", "other"]  # for Roboflow2+random.pt
 
 
-def transform_image(image_bytes):
-    transform = T.Compose(
+@lru_cache(maxsize=None)
+def get_transform():
+    """Prétraitement du classifieur, construit une seule fois."""
+    import torchvision.transforms as T
+
+    return T.Compose(
         [
             T.Resize((640, 640)),
             T.ToTensor(),
             T.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
         ]
     )
+
+
+def preprocess(image_bytes):
+    """Décode et redimensionne une image ; retourne un tenseur (3, 640, 640)."""
     image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    return transform(image).unsqueeze(0)
+    return get_transform()(image)
 
 
-def process_image(image_bytes, model):
-    img = transform_image(image_bytes)
-    output = model(img)
-    _, predicted = torch.max(output, 1)
-    return {"class": classes[predicted.item()]}
+def transform_image(image_bytes):
+    return preprocess(image_bytes).unsqueeze(0)
 
 
-def ViT(image_bytes):
-    model, _, preprocess = open_clip.create_model_and_transforms(
-        "ViT-B-32", pretrained="laion2b_s34b_b79k"
-    )
-    model.eval()  # model in train mode by default, impacts some models with BatchNorm or stochastic depth active
-    tokenizer = open_clip.get_tokenizer("ViT-B-32")
+def predict_tensors(tensors, model, max_batch_size=CLASSIFY_MAX_BATCH_SIZE):
+    """
+    Classifie des images prétraitées par batchs d'au plus `max_batch_size`.
+
+    Returns:
+        list: Un dict {"class", "confidence"} par tenseur, dans l'ordre.
+    """
+    import torch
+
+    results = []
+    max_batch_size = max(1, int(max_batch_size))
+    with torch.inference_mode():
+        for start in range(0, len(tensors), max_batch_size):
+            batch = torch.stack(tensors[start : start + max_batch_size])
+            probabilities = torch.softmax(model(batch), dim=1)
+            confidences, predicted = torch.max(probabilities, 1)
+            for index, confidence in zip(predicted.tolist(), confidences.tolist()):
+                results.append({"class": classes[index], "confidence": confidence})
+    return results
+
+
+def classify_batch(items, model, decode=preprocess, threads=CLASSIFY_DECODE_THREADS):
+    """
+    Classifie plusieurs images en une passe.
+
+    Les images sont décodées et redimensionnées en parallèle (PIL libère le
+    GIL), puis classifiées ensemble par `predict_tensors`.
+
+    Args:
+        items (list): Entrées passées à `decode` (par défaut, le contenu des images).
+        model: Classifieur chargé.
+        decode (callable): Retourne le tenseur prétraité d'une entrée.
+        threads (int): Nombre de threads de décodage.
 
-    image = preprocess(Image.open(io.BytesIO(image_bytes))).unsqueeze(0)
-    text = tokenizer(classes)
+    Returns:
+        list: Pour chaque entrée, {"class", "confidence"} ou {"error"} si elle
+        n'a pas pu être décodée.
+    """
 
-    with torch.no_grad():
-        image_features = model.encode_image(image)
-        text_features = model.encode_text(text)
-        image_features /= image_features.norm(dim=-1, keepdim=True)
-        text_features /= text_features.norm(dim=-1, keepdim=True)
+    def safe_decode(item):
+        try:
+            return decode(item)
+        except Exception as e:
+            return e
 
-        text_probs = (100.0 * image_features @ text_features.T).softmax(dim=-1)
-        _, predicted = torch.max(text_probs, 1)
+    if len(items) > 1 and threads > 1:
+        with ThreadPoolExecutor(
+            max_workers=min(threads, len(items)), thread_name_prefix="decode"
+        ) as executor:
+            decoded = list(executor.map(safe_decode, items))
+    else:
+        decoded = [safe_decode(item) for item in items]
 
-    return {"class": classes[predicted.item()]}
+    valid = [tensor for tensor in decoded if not isinstance(tensor, Exception)]
+    predictions = iter(predict_tensors(valid, model))
+    return [
+        {"error": str(tensor)} if isinstance(tensor, Exception) else next(predictions)
+        for tensor in decoded
+    ]
+
+
+def process_image(image_bytes, model, decode=preprocess):
+    return predict_tensors([decode(image_bytes)], model)[0]
+
+
+class ZeroShotClassifier:
+    """
+    Classifieur zero-shot open_clip (ViT, cocaViT) gardé en mémoire.
+
+    Les embeddings des prompts `classes` sont calculés et normalisés une seule
+    fois au chargement : une requête n'exécute que `encode_image` et un
+    produit matriciel. L'appel retourne des logits, comme le classifieur
+    EfficientNet, et passe donc par le même `predict_tensors`.
+    """
+
+    def __init__(self, model_name, pretrained):
+        import open_clip
+        import torch
+
+        self.model, _, self.transform = open_clip.create_model_and_transforms(
+            model_name, pretrained=pretrained
+        )
+        self.model.eval()  # model in train mode by default, impacts some models with BatchNorm or stochastic depth active
+        tokenizer = open_clip.get_tokenizer(model_name)
+        with torch.inference_mode():
+            text_features = self.model.encode_text(tokenizer(classes))
+            self.text_features = text_features / text_features.norm(dim=-1, keepdim=True)
+
+    def preprocess(self, image_bytes):
+        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        return self.transform(image)
+
+    def __call__(self, images):
+        image_features = self.model.encode_image(images)
+        image_features = image_features / image_features.norm(dim=-1, keepdim=True)
+        return 100.0 * image_features @ self.text_features.T
+
+
+registry.register(
+    "vit", lambda: ZeroShotClassifier("ViT-B-32", pretrained="laion2b_s34b_b79k")
+)
+registry.register(
+    "coca_vit",
+    lambda: ZeroShotClassifier(
+        "coca_ViT-L-14", pretrained="mscoco_finetuned_laion2B-s13B-b90k"
+    ),
+)
+
+# Backends de /predict/ -> nom du modèle dans le registre
+CLASSIFIER_BACKENDS = {"efficientnet": "classifier", "vit": "vit", "coca_vit": "coca_vit"}
+
+
+def get_classifier(backend="efficientnet"):
+    """Retourne (modèle, fonction de prétraitement) du backend de classification."""
+    if backend not in CLASSIFIER_BACKENDS:
+        raise ValueError(f"Backend de classification inconnu : {backend}")
+    model = registry.get(CLASSIFIER_BACKENDS[backend])
+    if isinstance(model, ZeroShotClassifier):
+        return model, model.preprocess
+    return model, preprocess
+
+
+def ViT(image_bytes):
+    return process_image(image_bytes, *get_classifier("vit"))
 
 
 def cocaViT(image_bytes):
-    model, _, transform = open_clip.create_model_and_transforms(
-        model_name="coca_ViT-L-14", pretrained="mscoco_finetuned_laion2B-s13B-b90k"
-    )
-    im = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    im = transform(im).unsqueeze(0)
-    tokenizer = open_clip.get_tokenizer("coca_ViT-L-14")
-    text = tokenizer(classes)
-    with torch.no_grad():
-        # generated = model.generate(im)
-        image_features = model.encode_image(im)
-        text_features = model.encode_text(text)
-        image_features /= image_features.norm(dim=-1, keepdim=True)
-        text_features /= text_features.norm(dim=-1, keepdim=True)
-        text_probs = (100.0 * image_features @ text_features.T).softmax(dim=-1)
-        _, predicted = torch.max(text_probs, 1)
-        return {"class": classes[predicted.item()]}
+    return process_image(image_bytes, *get_classifier("coca_vit"))
@@ -3,8 +3,111 @@ import numpy as np
 import os
 from walls import create_wall_meshes
 from rooms import extract_room_polygons, create_floor_meshes_with_texture
-from doors import cut_and_place_doors
-from windows import cut_and_place_windows
+from doors import place_doors
+from windows import place_windows
+from openings import cut_openings, cut_openings_analytic
+from tracing import count, stage
+
+# Passage du repère Z-up (plan) au repère Y-up de glTF
+ROOT_ROTATION = trimesh.transformations.rotation_matrix(
+    np.pi / 2, [-1, 0, 0], [0, 0, 0]
+)
+
+
+def merge_by_material(meshes, name):
+    """
+    Fusionne les meshes qui partagent le même matériau en un seul mesh
+    (un seul tampon de sommets, un seul noeud glTF, un seul draw call).
+
+    Les UV de chaque mesh sont conservées telles quelles. Les meshes sans
+    texture sont regroupés ensemble. Un groupe fusionné est nommé
+    `{name}_{k}`, k étant sa position dans la liste retournée ; un mesh seul
+    dans son groupe est retourné sans modification.
+    """
+    groups = {}
+    for mesh in meshes:
+        material = None
+        if mesh.visual.kind == "texture" and mesh.visual.uv is not None:
+            material = mesh.visual.material
+        groups.setdefault(id(material) if material is not None else None, []).append(
+            mesh
+        )
+
+    merged = []
+    for key, group in groups.items():
+        if len(group) == 1:
+            merged.append(group[0])
+            continue
+
+        if key is None:
+            mesh = trimesh.util.concatenate(group)
+        else:
+            offsets = np.cumsum([0] + [len(m.vertices) for m in group[:-1]])
+            mesh = trimesh.Trimesh(
+                vertices=np.vstack([m.vertices for m in group]),
+                faces=np.vstack([m.faces + o for m, o in zip(group, offsets)]),
+                visual=trimesh.visual.TextureVisuals(
+                    uv=np.vstack([m.visual.uv for m in group]),
+                    material=group[0].visual.material,
+                ),
+                process=False,
+            )
+        mesh.visual.name = f"{name}_{len(merged)}"
+        merged.append(mesh)
+
+    return merged
+
+
+def build_scene(meshes, instances, instancing=True):
+    """
+    Assemble la scène exportée.
+
+    Tous les objets sont rattachés à un noeud "root" qui porte la rotation
+    de 90° : aucun tableau de sommets n'est transformé. Avec `instancing=True`,
+    chaque modèle de porte ou fenêtre n'est stocké qu'une fois dans le GLB et
+    chaque ouverture est un noeud qui le référence avec sa propre matrice.
+    Sinon, chaque instance est copiée en un mesh indépendant.
+    """
+    scene = trimesh.Scene()
+    base = scene.graph.base_frame
+    scene.graph.update(frame_from=base, frame_to="root", matrix=ROOT_ROTATION)
+
+    for idx, mesh in enumerate(meshes):
+        name = mesh.visual.name if getattr(mesh.visual, "name", None) else f"Mesh_{idx}"
+        scene.add_geometry(mesh, geom_name=name, node_name=name, parent_node_name="root")
+
+    geometry_names = {}
+    for instance in instances:
+        if not instancing:
+            mesh = instance.to_mesh()
+            scene.add_geometry(
+                mesh,
+                geom_name=instance.name,
+                node_name=instance.name,
+                parent_node_name="root",
+            )
+            continue
+
+        # Une seule géométrie par modèle partagé, un noeud par ouverture
+        geom_name = geometry_names.get(id(instance.mesh))
+        if geom_name is None:
+            node_name = scene.add_geometry(
+                instance.mesh,
+                geom_name=instance.name.split("_")[0],
+                node_name=instance.name,
+                parent_node_name="root",
+                transform=instance.transform,
+            )
+            geometry_names[id(instance.mesh)] = scene.graph[node_name][1]
+        else:
+            scene.graph.update(
+                frame_from="root",
+                frame_to=instance.name,
+                matrix=instance.transform,
+                geometry=geom_name,
+            )
+
+    return scene
 
 
 def generate_3d_model_from_polygons(
@@ -18,76 +121,98 @@ def generate_3d_model_from_polygons(
     image_path,
     output_path="floorplan.glb",
     print_output=True,
+    progress=None,
+    instancing=True,
+    cut_mode="single",
+    merge_mode="floors",
 ):
     # print(f"🗞️ Real world scale: {real_world_scale}")
     # # Créer la mesh des murs
-    wall_mesh = create_wall_meshes(wall_polygons, wall_height, real_world_scale)
-
-    # Extraire les pièces
-    rooms_polygons = extract_room_polygons(wall_polygons)
-
-    # Créer les sols avec les textures
-    floor_meshes = create_floor_meshes_with_texture(
-        rooms_polygons, wall_mesh, floor_textures, real_world_scale
-    )
+    # En mode "analytic", les murs sont construits directement avec leurs ouvertures
+    # (étape "openings", après le placement des portes et fenêtres)
+    count("wall_polygons", len(wall_polygons))
+    if cut_mode != "analytic":
+        with stage("walls", progress):
+            wall_mesh = create_wall_meshes(wall_polygons, wall_height, real_world_scale)
+
+    # Placer les portes et les fenêtres, puis découper toutes les ouvertures
+    # en une seule opération
+    cut_boxes = []
+    with stage("doors", progress):
+        if door_data is not None:
+            door_path, doors_bbox, door_scale = door_data
+            door_cuts, placed_doors = place_doors(
+                door_path,
+                doors_bbox,
+                wall_bboxes.copy(),
+                door_scale,
+                real_world_scale,
+            )
+            cut_boxes.extend(door_cuts)
+        else:
+            placed_doors = None
 
-    # Placer les portes et les fenêtres
-    # def cut_and_place_doors(wall_mesh, door_path, doors_bbox, wall_bboxes, door_scale, real_world_scale, image_path):
-    if door_data is not None:
-        door_path, doors_bbox, door_scale = door_data
-        wall_mesh, placed_doors = cut_and_place_doors(
-            wall_mesh,
-            door_path,
-            doors_bbox,
-            wall_bboxes.copy(),
-            door_scale,
-            real_world_scale,
-            image_path,
-        )
-        # wall_mesh, placed_doors = cut_and_place_doors_bbox(
-        #     wall_mesh,
-        #     doors_bbox,
-        #     wall_bboxes.copy(),
-        #     real_world_scale,
-        #     image_path,
-        # )
+    # Placer les fenêtres
+    with stage("windows", progress):
+        if window_data is not None:
+            window_path, windows_bbox, window_scale = window_data
+            window_cuts, placed_windows = place_windows(
+                window_path,
+                windows_bbox,
+                wall_bboxes.copy(),
+                wall_height,
+                window_scale,
+                real_world_scale,
+            )
+            cut_boxes.extend(window_cuts)
+        else:
+            placed_windows = None
+
+    count("cutters", len(cut_boxes))
+    with stage("openings", progress):
+        if cut_mode == "analytic":
+            # Murs rectilignes + ouvertures alignées : découpe 2D, sans booléen 3D
+            wall_mesh = cut_openings_analytic(
+                wall_polygons, wall_height, real_world_scale, cut_boxes
+            )
+        else:
+            wall_mesh = cut_openings(wall_mesh, cut_boxes, mode=cut_mode)
 
-    else:
-        placed_doors = None
+    # Extraire les pièces
+    with stage("rooms", progress):
+        rooms_polygons = extract_room_polygons(wall_polygons)
+        count("room_polygons", len(rooms_polygons))
 
-    # Placer les fenêtres
-    # def cut_and_place_windows(wall_mesh, window_path, windows_bbox, wall_bboxes, wall_height, window_scale, real_world_scale, image_path):
-    if window_data is not None:
-        window_path, windows_bbox, window_scale = window_data
-        wall_mesh, placed_windows = cut_and_place_windows(
-            wall_mesh,
-            window_path,
-            windows_bbox,
-            wall_bboxes.copy(),
-            wall_height,
-            window_scale,
-            real_world_scale,
-            image_path,
+        # Créer les sols avec les textures
+        floor_meshes = create_floor_meshes_with_texture(
+            rooms_polygons, wall_mesh, floor_textures, real_world_scale
         )
-    else:
-        placed_windows = None
 
     meshes = [wall_mesh]
 
     if floor_meshes is not None:
+        # Un seul mesh par texture de sol plutôt qu'un mesh par pièce
+        if merge_mode in ("floors", "all"):
+            floor_meshes = merge_by_material(floor_meshes, "Floors")
         meshes.extend(floor_meshes)
 
+    # Les murs et le socle (sans texture) fusionnés en un seul mesh
+    if merge_mode == "all":
+        meshes = merge_by_material(meshes, "Merged")
+
+    # Les portes et fenêtres sont des instances d'un modèle partagé
+    instances = []
     if placed_doors is not None:
-        meshes.extend(placed_doors)
+        instances.extend(placed_doors)
 
     if placed_windows is not None:
-        meshes.extend(placed_windows)
+        instances.extend(placed_windows)
 
-    # rotate by 90 degrees all the meshes
-    for mesh in meshes:
-        mesh.apply_transform(
-            trimesh.transformations.rotation_matrix(np.pi / 2, [-1, 0, 0], [0, 0, 0])
-        )
+    count(
+        "triangles",
+        sum(len(mesh.faces) for mesh in meshes)
+        + sum(len(instance.mesh.faces) for instance in instances),
+    )
 
     # mesh.apply_transform(
     # # Add texture to the wall mesh
@@ -95,15 +220,20 @@ def generate_3d_model_from_polygons(
     # wall_mesh = meshes[0] = add_texture_to_mesh(wall_mesh, texture_path)
 
     # On ajoute murs + sols + portes
-    scene = trimesh.Scene(meshes)
+    with stage("export", progress):
+        scene = build_scene(meshes, instances, instancing=instancing)
 
-    # check path
-    if not os.path.exists(os.path.dirname(output_path)):
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        # Sans output_path, rien n'est écrit : l'appelant exporte la scène en mémoire
+        if output_path is not None:
+            # check path
+            if not os.path.exists(os.path.dirname(output_path)):
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-    scene.export(output_path)
+            scene.export(output_path)
 
-    if print_output:
-        print(f"📌 Fichier GLB avec {len(meshes)} objets enregistré : {output_path}")
+            if print_output:
+                print(
+                    f"📌 Fichier GLB avec {len(meshes) + len(instances)} objets enregistré : {output_path}"
+                )
 
     return scene
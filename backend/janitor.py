@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+from my_logger import my_logger
+
+
+def expire_files(directories, max_age, exclude=()):
+    """
+    Supprime les fichiers de `directories` (récursivement) non modifiés depuis
+    plus de `max_age` secondes. Les dossiers de `exclude` (caches qui gèrent
+    déjà leur propre éviction) sont ignorés. Retourne le nombre de fichiers
+    supprimés.
+    """
+    excluded = {os.path.abspath(path) for path in exclude}
+    limit = time.time() - max_age
+    removed = 0
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = [
+                name
+                for name in dirs
+                if os.path.abspath(os.path.join(root, name)) not in excluded
+            ]
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.stat(path).st_mtime < limit:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+    return removed
+
+
+class Janitor:
+    """Thread qui appelle expire_files toutes les `interval` secondes."""
+
+    def __init__(self, directories, max_age, interval, exclude=()):
+        self.directories = directories
+        self.max_age = max_age
+        self.interval = interval
+        self.exclude = exclude
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        removed = expire_files(self.directories, self.max_age, self.exclude)
+        if removed:
+            my_logger.info(f"Nettoyage : {removed} fichiers expirés supprimés")
+        return removed
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                my_logger.exception("Erreur pendant le nettoyage des fichiers")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None and self.max_age > 0:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
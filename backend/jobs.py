@@ -0,0 +1,193 @@
+import json
+import os
+import re
+import time
+import uuid
+from worker_pool import WorkerPool
+from result_cache import ResultCache, write_atomic
+from my_logger import my_logger
+
+# Étapes de la génération, dans l'ordre où elles sont rapportées
+STAGES = [
+    "detection",
+    "bbox_pipeline",
+    "walls",
+    "doors",
+    "windows",
+    "openings",
+    "rooms",
+    "export",
+]
+
+# Identifiant de job (uuid4 hexadécimal), vérifié avant tout accès disque
+JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class Job:
+    """État d'une génération 3D lancée via l'API /jobs/."""
+
+    FIELDS = ("job_id", "status", "stage", "error", "created_at", "finished_at")
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.status = "queued"  # queued, running, done, failed
+        self.stage = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": STAGES,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        job = cls(data["job_id"])
+        for field in cls.FIELDS:
+            setattr(job, field, data.get(field))
+        return job
+
+
+class JobManager:
+    """
+    File de jobs exécutée par un WorkerPool, avec un état partagé sur disque.
+
+    `concurrency` jobs tournent en même temps, `max_queue` peuvent attendre.
+    L'état de chaque job est écrit dans `directory/<id>.json` à chaque
+    changement d'étape, et le GLB produit dans `directory/<id>.glb` : avec
+    plusieurs processus uvicorn (--workers), n'importe lequel peut répondre
+    à /jobs/{id} et /jobs/{id}/result, pourvu que `directory` soit partagé.
+
+    Les résultats ne sont pas gardés en mémoire. Leur taille totale est bornée
+    par `max_result_bytes` (les plus anciens sont supprimés au-delà), et les
+    jobs terminés sont oubliés après `ttl` secondes. Les jobs jamais terminés
+    (processus arrêté ou redémarré en cours de job) sont oubliés `timeout`
+    secondes après leur création.
+
+    Toutes les méthodes font des accès disque : depuis une coroutine, les
+    appeler dans un threadpool.
+    """
+
+    def __init__(
+        self,
+        directory,
+        concurrency=1,
+        max_queue=32,
+        ttl=3600,
+        max_result_bytes=0,
+        timeout=86400,
+    ):
+        self.pool = WorkerPool(max_workers=concurrency, max_queue=max_queue)
+        self.directory = directory
+        self.ttl = ttl
+        self.timeout = timeout
+        self.results = ResultCache(directory, max_bytes=max_result_bytes)
+
+    def _state_path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _save(self, job):
+        os.makedirs(self.directory, exist_ok=True)
+        write_atomic(
+            self._state_path(job.job_id),
+            lambda f: json.dump(job.to_dict(), f),
+            mode="w",
+        )
+
+    def _purge(self):
+        """
+        Supprime l'état et le résultat des jobs terminés depuis plus de `ttl`,
+        et des jobs non terminés créés depuis plus de `timeout`.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        now = time.time()
+        for name in os.listdir(self.directory):
+            job_id, extension = os.path.splitext(name)
+            if extension != ".json":
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                # L'état est écrit à la création et à la fin du job : s'il est
+                # récent, le job n'a pas encore expiré
+                if now - os.path.getmtime(path) <= min(self.ttl, self.timeout):
+                    continue
+                job = self.get(job_id)
+            except OSError:
+                continue
+            if job is None:
+                continue
+            if job.finished_at is not None:
+                if now - job.finished_at <= self.ttl:
+                    continue
+            elif now - job.created_at <= self.timeout:
+                continue
+            for expired in (path, self.results.path_for(job_id)):
+                try:
+                    os.remove(expired)
+                except FileNotFoundError:
+                    pass
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Lance func(*args, progress=..., **kwargs) en arrière-plan.
+
+        func doit retourner le résultat (le GLB en bytes), écrit sur disque
+        jusqu'à l'expiration du job. Lève PoolFullError si la file est pleine.
+        """
+        self._purge()
+        job = Job(uuid.uuid4().hex)
+
+        def set_stage(stage):
+            job.stage = stage
+            self._save(job)
+
+        def run():
+            job.status = "running"
+            self._save(job)
+            try:
+                result = func(*args, progress=set_stage, **kwargs)
+                self.results.store_bytes(job.job_id, result)
+                job.status = "done"
+            except Exception as e:
+                my_logger.exception(f"Job {job.job_id} en échec")
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                self._save(job)
+
+        self._save(job)
+        try:
+            self.pool.submit(run)
+        except Exception:
+            os.remove(self._state_path(job.job_id))
+            raise
+        return job
+
+    def get(self, job_id):
+        """Retourne le job, ou None s'il est inconnu ou expiré."""
+        if not JOB_ID.fullmatch(job_id):
+            return None
+        try:
+            with open(self._state_path(job_id)) as f:
+                return Job.from_dict(json.load(f))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def result(self, job_id):
+        """Retourne le GLB d'un job terminé, ou None s'il a été supprimé."""
+        if not JOB_ID.fullmatch(job_id):
+            return None
+        return self.results.load_bytes(job_id)
+
+    @property
+    def queue_depth(self):
+        return self.pool.pending
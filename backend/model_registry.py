@@ -0,0 +1,83 @@
+import os
+import threading
+from my_logger import my_logger
+
+
+class ModelRegistry:
+    """
+    Garde les modèles chargés en mémoire pour toute la durée du processus.
+
+    Chaque modèle est enregistré avec une fonction de chargement et le chemin
+    de son checkpoint. Le modèle est chargé au premier appel de `get` (ou par
+    `warmup`), puis réutilisé. Si le checkpoint est modifié sur le disque, le
+    modèle est rechargé automatiquement au prochain appel.
+
+    Chaque modèle a son propre verrou : le chargement d'un modèle ne bloque
+    pas l'accès aux autres modèles déjà chargés.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader, checkpoint_path=None, warmup=None):
+        """
+        Enregistre un modèle.
+
+        Args:
+            name (str): Nom du modèle dans le registre.
+            loader (callable): Fonction sans argument qui retourne le modèle chargé.
+            checkpoint_path (str): Fichier surveillé pour le rechargement automatique.
+            warmup (callable): Fonction optionnelle appelée avec le modèle après chargement.
+        """
+        with self._lock:
+            self._loaders[name] = (loader, checkpoint_path, warmup)
+            self._locks.setdefault(name, threading.RLock())
+
+    def _checkpoint_mtime(self, name):
+        _, checkpoint_path, _ = self._loaders[name]
+        if checkpoint_path is None or not os.path.exists(checkpoint_path):
+            return None
+        return os.path.getmtime(checkpoint_path)
+
+    def _load(self, name):
+        loader, checkpoint_path, warmup = self._loaders[name]
+        my_logger.info(f"Chargement du modèle '{name}' ({checkpoint_path})")
+        mtime = self._checkpoint_mtime(name)
+        model = loader()
+        if warmup is not None:
+            warmup(model)
+        self._models[name] = (model, mtime)
+        return model
+
+    def get(self, name):
+        """Retourne le modèle, en le chargeant ou rechargeant si nécessaire."""
+        if name not in self._loaders:
+            raise KeyError(f"Modèle inconnu : {name}")
+
+        with self._locks[name]:
+            if name in self._models:
+                model, mtime = self._models[name]
+                if mtime == self._checkpoint_mtime(name):
+                    return model
+                my_logger.info(f"Checkpoint de '{name}' modifié, rechargement.")
+            return self._load(name)
+
+    def warmup(self, *names):
+        """Charge à l'avance les modèles donnés (tous si aucun nom n'est donné)."""
+        for name in names or list(self._loaders):
+            self.get(name)
+
+    def unload(self, name=None):
+        """Libère un modèle (ou tous les modèles si name est None)."""
+        for key in list(self._locks) if name is None else [name]:
+            with self._locks.get(key, self._lock):
+                self._models.pop(key, None)
+
+    def is_loaded(self, name):
+        return name in self._models
+
+
+registry = ModelRegistry()
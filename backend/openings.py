@@ -0,0 +1,486 @@
+import manifold3d
+import trimesh
+import shapely
+import numpy as np
+from shapely.affinity import scale as scale_geometry
+from extrusion_pool import extrude_polygons
+from constants import ANALYTIC_CUT_MAX_CELL_RATIO
+from my_logger import my_logger
+
+
+def bounds_overlap(bounds_a, bounds_b):
+    """Vrai si deux boîtes englobantes 3D [[min], [max]] se touchent."""
+    return bool(
+        np.all(bounds_a[0] <= bounds_b[1]) and np.all(bounds_b[0] <= bounds_a[1])
+    )
+
+
+def difference(mesh, cutters):
+    """
+    Soustrait les cutters du mesh en une seule opération Manifold.
+
+    Chaque cutter reste un opérande distinct : Manifold les réunit avant la
+    différence. Concaténés en un seul mesh, des cutters qui se chevauchent
+    donneraient un opérande non manifold et un résultat faux.
+    """
+    return trimesh.boolean.boolean_manifold(
+        [mesh, *cutters], operation="difference", check_volume=False
+    )
+
+
+def cut_openings(wall_mesh, cut_boxes, mode="single"):
+    """
+    Découpe toutes les ouvertures (portes et fenêtres) dans les murs.
+
+    Args:
+        wall_mesh (trimesh.Trimesh): Mesh des murs.
+        cut_boxes (list): Boxes de découpe des portes et fenêtres.
+        mode (str): "single" fait une seule différence booléenne entre tous les
+            murs et toutes les boxes. "per_component" sépare les murs en
+            composantes connexes et ne découpe que celles dont la boîte
+            englobante touche une box ; les autres sont gardées telles quelles.
+
+    Returns:
+        trimesh.Trimesh: Mesh des murs découpé.
+    """
+    if not cut_boxes:
+        return wall_mesh
+
+    if mode == "single":
+        return difference(wall_mesh, cut_boxes)
+
+    if mode != "per_component":
+        raise ValueError(f"Mode de découpe inconnu : {mode}")
+
+    components = wall_mesh.split(only_watertight=False)
+    cutter_bounds = [box.bounds for box in cut_boxes]
+
+    pieces = []
+    for component in components:
+        touching = [
+            box
+            for box, bounds in zip(cut_boxes, cutter_bounds)
+            if bounds_overlap(component.bounds, bounds)
+        ]
+        pieces.append(difference(component, touching) if touching else component)
+
+    return trimesh.util.concatenate(pieces)
+
+
+def is_axis_aligned_box(mesh, tol=1e-6):
+    """Vrai si le mesh est une boîte alignée sur les axes (8 sommets aux coins)."""
+    vertices = np.asarray(mesh.vertices)
+    if len(vertices) != 8:
+        return False
+    lo, hi = vertices.min(axis=0), vertices.max(axis=0)
+    at_corner = (np.abs(vertices - lo) < tol) | (np.abs(vertices - hi) < tol)
+    return bool(at_corner.all())
+
+
+def is_rectilinear(polygon, tol=1e-6):
+    """Vrai si toutes les arêtes du polygone (trous compris) sont horizontales ou verticales."""
+    for ring in [polygon.exterior, *polygon.interiors]:
+        coords = np.asarray(ring.coords)
+        edges = np.diff(coords, axis=0)
+        if not np.all((np.abs(edges[:, 0]) < tol) | (np.abs(edges[:, 1]) < tol)):
+            return False
+    return True
+
+
+def grid_lines(values, tol):
+    """Valeurs triées et dédoublonnées (à tol près) servant de lignes de grille."""
+    values = np.unique(values)
+    if len(values) == 0:
+        return values
+    return values[np.concatenate([[True], np.diff(values) > tol])]
+
+
+def runs(values, target):
+    """
+    Suites de cellules égales à `target` le long du dernier axe d'un tableau.
+
+    Returns:
+        tuple: (indices des autres axes..., début, fin) de chaque suite.
+    """
+    hits = np.zeros((*values.shape[:-1], values.shape[-1] + 2), dtype=np.int8)
+    hits[..., 1:-1] = values == target
+    steps = np.diff(hits, axis=-1)
+    *lines, starts = np.nonzero(steps == 1)
+    ends = np.nonzero(steps == -1)[-1]
+    return (*lines, starts, ends)
+
+
+def cycles(following):
+    """
+    Parcourt les cycles de la permutation `following` sans boucle Python
+    (doublement de pointeurs).
+
+    Returns:
+        tuple: (plus petit indice du cycle de chaque élément, nombre de pas
+        restants avant de revenir à ce plus petit indice).
+    """
+    n = len(following)
+    label, jump, length = np.arange(n), following, 1
+    while length < n:
+        label = np.minimum(label, label[jump])
+        jump = jump[jump]
+        length *= 2
+
+    # Couper chaque cycle avant son plus petit indice, puis compter les pas
+    # jusqu'à la coupure
+    following = np.where(following == label, -1, following)
+    remaining = (following >= 0).astype(np.int64)
+    jump = following
+    while (jump >= 0).any():
+        active = jump >= 0
+        remaining[active] += remaining[jump[active]]
+        jump = np.where(active, jump[np.maximum(jump, 0)], -1)
+    return label, remaining
+
+
+def boundary_rings(masks):
+    """
+    Anneaux du bord des cellules vraies d'une pile de masques 2D (plan, u, v),
+    en coordonnées entières de la grille, le plein toujours à gauche : les
+    extérieurs sont dans le sens trigonométrique et les trous dans le sens
+    horaire.
+
+    Les arêtes de bord alignées sont fusionnées en segments maximaux, puis
+    chaînées ; à un sommet où deux régions se touchent par un coin, le
+    chaînage tourne à gauche pour garder les anneaux séparés.
+
+    Returns:
+        tuple: (sommets (n, 3) en (plan, u, v), anneau de chaque sommet), les
+        anneaux étant numérotés à la suite et triés par plan.
+    """
+    planes, nu, nv = masks.shape
+    padded = np.zeros((planes, nu + 2, nv + 2), dtype=np.int8)
+    padded[:, 1:-1, 1:-1] = masks
+    # Bords sur les droites u = i : +1 si le plein est du côté +u (parcours -v)
+    across_u = padded[:, 1:, 1:-1] - padded[:, :-1, 1:-1]
+    # Bords sur les droites v = j : +1 si le plein est du côté +v (parcours +u)
+    across_v = (padded[:, 1:-1, 1:] - padded[:, 1:-1, :-1]).transpose(0, 2, 1)
+
+    starts, ends = [], []
+    for sign in (1, -1):
+        plane, line, start, end = runs(across_u, sign)
+        forward = (
+            np.column_stack([plane, line, start]),
+            np.column_stack([plane, line, end]),
+        )
+        low, high = forward[::-1] if sign == 1 else forward
+        starts.append(low)
+        ends.append(high)
+        plane, line, start, end = runs(across_v, sign)
+        forward = (
+            np.column_stack([plane, start, line]),
+            np.column_stack([plane, end, line]),
+        )
+        low, high = forward if sign == 1 else forward[::-1]
+        starts.append(low)
+        ends.append(high)
+    starts, ends = np.vstack(starts), np.vstack(ends)
+    directions = np.sign(ends[:, 1:] - starts[:, 1:])
+
+    # Segment suivant : celui qui part de l'extrémité, à gauche s'il y en a deux
+    def encode_uv(points):
+        return (points[:, 0] * (nu + 1) + points[:, 1]) * (nv + 1) + points[:, 2]
+
+    start_codes = encode_uv(starts)
+    order = np.argsort(start_codes, kind="stable")
+    sorted_codes = start_codes[order]
+    end_codes = encode_uv(ends)
+    first = order[np.searchsorted(sorted_codes, end_codes)]
+    last = order[np.searchsorted(sorted_codes, end_codes, "right") - 1]
+    turn = directions[:, 0] * directions[first, 1] - directions[:, 1] * directions[first, 0]
+    following = np.where(turn > 0, first, last)
+
+    # Chaque anneau commence par son plus petit segment
+    label, remaining = cycles(following)
+    order = np.lexsort((-remaining, label, starts[:, 0]))
+    label = label[order]
+    ring_ids = np.cumsum(np.r_[False, label[1:] != label[:-1]])
+    return starts[order], ring_ids
+
+
+def boundary_faces(solid):
+    """
+    Faces de bord d'une grille de cellules pleines (x, y, z).
+
+    Pour chaque plan de la grille et chaque sens de normale, les faces des
+    cellules pleines dont la voisine est vide forment une région 2D dont les
+    axes (u, v) suivent l'axe normal dans l'ordre circulaire (u x v = +axe).
+
+    Returns:
+        tuple: (sommets (n, 3) en indices de grille (x, y, z), anneau de
+        chaque sommet, face de chaque anneau, (axe, signe) de chaque face).
+        Une face regroupe tous les anneaux d'un même plan et d'un même sens.
+    """
+    points, ring_ids, ring_faces, faces = [], [], [], []
+    for axis in range(3):
+        moved = np.moveaxis(solid, axis, 0)
+        if axis == 1:
+            moved = moved.transpose(0, 2, 1)
+        pad = np.zeros((1, *moved.shape[1:]), dtype=bool)
+        padded = np.concatenate([pad, moved, pad])
+        below, above = padded[:-1], padded[1:]
+        for sign, masks in ((1, below & ~above), (-1, above & ~below)):
+            if not masks.any():
+                continue
+            uv, rings = boundary_rings(masks)
+            grid = np.empty_like(uv)
+            grid[:, axis] = uv[:, 0]
+            grid[:, (axis + 1) % 3] = uv[:, 1]
+            grid[:, (axis + 2) % 3] = uv[:, 2]
+
+            # Un plan = une face
+            ring_planes = uv[np.searchsorted(rings, np.arange(rings[-1] + 1)), 0]
+            plane_ids = np.cumsum(np.r_[False, ring_planes[1:] != ring_planes[:-1]])
+            points.append(grid)
+            ring_ids.append(rings + sum(len(r) for r in ring_faces))
+            ring_faces.append(plane_ids + len(faces))
+            faces.extend([(axis, sign)] * (plane_ids[-1] + 1))
+    return (
+        np.vstack(points),
+        np.concatenate(ring_ids),
+        np.concatenate(ring_faces),
+        faces,
+    )
+
+
+def encode(points, direction, size):
+    """
+    Code entier de points de la grille, trié d'abord par la droite parallèle à
+    `direction` qui les porte, puis par la position le long de cette droite.
+    """
+    first, second = (direction + 1) % 3, (direction + 2) % 3
+    return (points[:, first] * size + points[:, second]) * size + points[:, direction]
+
+
+def split_edges(points, ring_ids, size):
+    """
+    Ajoute aux anneaux les sommets des autres faces situés sur leurs arêtes.
+
+    Deux faces voisines partagent ainsi exactement les mêmes sommets le long
+    de leur arête commune (pas de jonction en T), ce qui rend le mesh fermé
+    une fois les sommets soudés.
+
+    Args:
+        points (np.ndarray): Sommets (n, 3) de tous les anneaux, à la suite.
+        ring_ids (np.ndarray): Anneau de chaque sommet (croissant).
+        size (int): Borne des indices de grille.
+
+    Returns:
+        tuple: (sommets, anneau de chaque sommet) après insertion.
+    """
+    # Sommet suivant dans le même anneau (le dernier revient au premier)
+    ring_start = np.flatnonzero(np.r_[True, ring_ids[1:] != ring_ids[:-1]])
+    ring_end = np.append(ring_start[1:], len(points))
+    following = np.arange(1, len(points) + 1)
+    following[ring_end - 1] = ring_start
+    ends = points[following]
+    directions = np.argmax(points != ends, axis=1)
+
+    counts = np.zeros(len(points), dtype=np.int64)
+    first_inner = np.zeros(len(points), dtype=np.int64)
+    codes = [None] * 3
+    for direction in range(3):
+        edges = np.flatnonzero(directions == direction)
+        codes[direction] = np.unique(encode(points, direction, size))
+        start_codes = encode(points[edges], direction, size)
+        end_codes = encode(ends[edges], direction, size)
+        low = np.searchsorted(codes[direction], np.minimum(start_codes, end_codes), "right")
+        high = np.searchsorted(codes[direction], np.maximum(start_codes, end_codes))
+        counts[edges] = high - low
+        first_inner[edges] = low
+
+    # Chaque arête devient son sommet de départ suivi des sommets intérieurs,
+    # dans le sens de parcours de l'arête
+    total = counts + 1
+    out_start = np.cumsum(total) - total
+    out = np.repeat(points, total, axis=0)
+    out_rings = np.repeat(ring_ids, total)
+    edge = np.repeat(np.arange(len(points)), counts)
+    rank = np.arange(len(edge)) - np.repeat(np.cumsum(counts) - counts, counts)
+    descending = points[edge, directions[edge]] > ends[edge, directions[edge]]
+    rank = np.where(descending, counts[edge] - 1 - rank, rank)
+    slots = np.repeat(out_start + 1, counts) + np.arange(len(edge)) - np.repeat(
+        np.cumsum(counts) - counts, counts
+    )
+    for direction in range(3):
+        selected = directions[edge] == direction
+        positions = codes[direction][first_inner[edge[selected]] + rank[selected]] % size
+        out[slots[selected], direction] = positions
+    return out, out_rings
+
+
+def analytic_grid(polygon, height, cutters, tol=1e-9):
+    """
+    Lignes de la grille de `analytic_cut` : coordonnées des sommets du polygone
+    et des bords des cutters (ramenés dans le prisme), en x, y et z.
+
+    Returns:
+        tuple: (xs, ys, zs, bornes des cutters (n, 2, 3)).
+    """
+    bounds = np.array([cutter.bounds for cutter in cutters]).reshape(-1, 2, 3)
+    coords = shapely.get_coordinates(polygon)
+    xmin, ymin, xmax, ymax = polygon.bounds
+
+    xs = np.clip(bounds[:, :, 0].ravel(), xmin, xmax)
+    ys = np.clip(bounds[:, :, 1].ravel(), ymin, ymax)
+    zs = np.clip(bounds[:, :, 2].ravel(), 0, height)
+    xs = grid_lines(np.concatenate([coords[:, 0], xs]), tol)
+    ys = grid_lines(np.concatenate([coords[:, 1], ys]), tol)
+    zs = grid_lines(np.concatenate([[0.0, height], zs]), tol)
+    return xs, ys, zs, bounds
+
+
+def analytic_cut_fits(polygon, height, cutters):
+    """
+    Vrai si la grille de `analytic_cut` reste petite devant le polygone et les
+    cutters (voir ANALYTIC_CUT_MAX_CELL_RATIO).
+
+    Son coût croît avec le nombre de cellules, celui de la découpe booléenne
+    avec le nombre de sommets. Sur un plan détecté, les murs ne sont pas
+    alignés au pixel près : chaque bord ajoute sa propre ligne de grille et
+    le nombre de cellules explose.
+    """
+    xs, ys, zs, _ = analytic_grid(polygon, height, cutters)
+    cells = (len(xs) - 1) * (len(ys) - 1) * (len(zs) - 1)
+    size = shapely.get_num_coordinates(polygon) + 8 * len(cutters)
+    return cells <= ANALYTIC_CUT_MAX_CELL_RATIO * size
+
+
+def analytic_cut(polygon, height, cutters, tol=1e-9):
+    """
+    Découpe les ouvertures dans le prisme polygon x [0, height] sans booléen 3D.
+
+    Le polygone doit être rectiligne et les cutters des boîtes alignées sur
+    les axes. Les coordonnées des sommets du polygone et des bords des cutters
+    forment une grille 3D dont chaque cellule est entièrement pleine ou vide :
+    une cellule est pleine si son centre est dans le polygone et dans aucun
+    cutter. Seul le bord de ce volume est construit : sur chaque plan de la
+    grille, les faces de cellules qui séparent le plein du vide sont réunies
+    en polygones, triangulés après l'ajout des sommets des faces voisines sur
+    leurs arêtes. Le résultat est un seul solide fermé, sans face interne,
+    exact et sans triangulation 3D. Seule exception : deux cellules pleines
+    qui ne se touchent que par une arête partagent cette arête (4 faces).
+    """
+    xs, ys, zs, bounds = analytic_grid(polygon, height, cutters, tol)
+    cx, cy, cz = (xs[:-1] + xs[1:]) / 2, (ys[:-1] + ys[1:]) / 2, (zs[:-1] + zs[1:]) / 2
+
+    # Cellules (x, y) dans le polygone, étendues sur toutes les tranches z
+    gx, gy = np.meshgrid(cx, cy, indexing="ij")
+    inside = shapely.contains_xy(polygon, gx, gy)
+    solid = np.repeat(inside[:, :, None], len(cz), axis=2)
+
+    # Retirer les cellules couvertes par chaque cutter
+    ix = np.searchsorted(cx, bounds[:, :, 0]).tolist()
+    iy = np.searchsorted(cy, bounds[:, :, 1]).tolist()
+    iz = np.searchsorted(cz, bounds[:, :, 2]).tolist()
+    for (x0, x1), (y0, y1), (z0, z1) in zip(ix, iy, iz):
+        solid[x0:x1, y0:y1, z0:z1] = False
+
+    if not solid.any():
+        return None
+
+    points, ring_ids, ring_faces, faces = boundary_faces(solid)
+    size = max(len(xs), len(ys), len(zs)) + 1
+    points, ring_ids = split_edges(points, ring_ids, size)
+
+    # Trianguler chaque face dans son plan (u, v), tous ses anneaux ensemble.
+    # La triangulation se fait sur les coordonnées réelles : les lignes de la
+    # grille ne sont pas régulières, et des triangles valides en indices de
+    # grille peuvent se replier une fois placés aux coordonnées réelles.
+    coordinates = np.column_stack(
+        [xs[points[:, 0]], ys[points[:, 1]], zs[points[:, 2]]]
+    )
+    ring_bounds = np.searchsorted(ring_ids, np.arange(len(ring_faces) + 1)).tolist()
+    face_rings = np.searchsorted(ring_faces, np.arange(len(faces) + 1)).tolist()
+    triangles = []
+    for face, (axis, sign) in enumerate(faces):
+        first, last = face_rings[face], face_rings[face + 1]
+        uv = coordinates[ring_bounds[first] : ring_bounds[last]][
+            :, [(axis + 1) % 3, (axis + 2) % 3]
+        ]
+        rings = np.split(uv, np.subtract(ring_bounds[first + 1 : last], ring_bounds[first]))
+        triangulated = manifold3d.triangulate(rings).astype(np.int64)
+        if sign < 0:
+            triangulated = triangulated[:, ::-1]
+        triangles.append(triangulated + ring_bounds[first])
+
+    # Souder les sommets identiques (indices entiers de la grille, exacts)
+    _, unique_index, inverse = np.unique(
+        encode(points, 2, size), return_index=True, return_inverse=True
+    )
+    return trimesh.Trimesh(
+        vertices=coordinates[unique_index],
+        faces=inverse.reshape(-1)[np.vstack(triangles)],
+        process=False,
+    )
+
+
+def cut_openings_analytic(wall_polygons, wall_height, real_world_scale, cut_boxes):
+    """
+    Construit les murs découpés directement à partir des polygones 2D.
+
+    Chaque polygone rectiligne est traité par `analytic_cut` avec les cutters
+    qui le touchent, si sa grille reste petite (`analytic_cut_fits`). Les
+    autres polygones (non rectilignes, grille trop fine, échec de
+    `analytic_cut`), ou tous les murs si un cutter n'est pas une boîte
+    alignée, sont extrudés comme dans `create_wall_meshes` (pool de processus
+    et cache de géométrie) puis découpés par `difference`.
+    """
+    height = wall_height * real_world_scale
+    cutters_are_boxes = all(is_axis_aligned_box(box) for box in cut_boxes)
+
+    pieces = []
+    fallback = []
+    for idx, polygon in enumerate(wall_polygons):
+        if not polygon.is_valid:
+            polygon = polygon.buffer(0)
+        scaled = scale_geometry(polygon, real_world_scale, real_world_scale, origin=(0, 0))
+        xmin, ymin, xmax, ymax = scaled.bounds
+        polygon_bounds = np.array([[xmin, ymin, 0], [xmax, ymax, height]])
+        touching = [
+            box for box in cut_boxes if bounds_overlap(polygon_bounds, box.bounds)
+        ]
+
+        parts = shapely.get_parts(scaled)
+        if (
+            cutters_are_boxes
+            and all(is_rectilinear(part) for part in parts)
+            and analytic_cut_fits(scaled, height, touching)
+        ):
+            try:
+                mesh = analytic_cut(scaled, height, touching)
+            except Exception as e:
+                my_logger.warning(
+                    f"Découpe analytique du polygone {idx} impossible, "
+                    f"découpe booléenne à la place : {e}"
+                )
+            else:
+                if mesh is not None:
+                    pieces.append(mesh)
+                continue
+        fallback.append((idx, polygon, touching))
+
+    meshes = extrude_polygons([polygon for _, polygon, _ in fallback], wall_height)
+    for (idx, _, touching), mesh in zip(fallback, meshes):
+        if isinstance(mesh, Exception):
+            my_logger.error(f"Erreur lors de l'extrusion du polygone {idx}: {mesh}")
+            continue
+        mesh.apply_scale(real_world_scale)
+        if touching:
+            try:
+                mesh = difference(mesh, touching)
+            except Exception as e:
+                my_logger.error(
+                    f"Découpe des ouvertures du polygone {idx} impossible, "
+                    f"mur gardé sans ouvertures : {e}"
+                )
+        pieces.append(mesh)
+
+    if not pieces:
+        raise ValueError("Aucun polygone à traiter.")
+    return trimesh.util.concatenate(pieces)
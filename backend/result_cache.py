@@ -0,0 +1,255 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+import shapely
+from my_logger import my_logger
+
+
+def hash_bytes(data: bytes) -> str:
+    """Retourne l'empreinte SHA-256 hexadécimale de data."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_signature(path):
+    """Identifie un fichier d'asset par son chemin, sa taille et sa date de modification."""
+    if not os.path.exists(path):
+        return [path, None, None]
+    stat = os.stat(path)
+    return [path, stat.st_size, stat.st_mtime_ns]
+
+
+def write_atomic(path, write, mode="wb"):
+    """
+    Écrit un fichier via un fichier temporaire unique puis `os.replace`.
+
+    `write` est appelée avec le fichier temporaire ouvert. Un lecteur voit
+    l'ancien ou le nouveau contenu complet, jamais un fichier partiel, même si
+    deux écritures de la même clé ont lieu en même temps.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class ResultCache:
+    """
+    Cache des modèles GLB générés, adressé par contenu.
+
+    La clé est un hash de l'image, de l'échelle et des paramètres de génération.
+    Les fichiers sont stockés dans `directory/<clé>.glb`. Quand la taille totale
+    dépasse `max_bytes`, les fichiers les moins récemment utilisés sont supprimés ;
+    avec `max_bytes` = 0, le cache est désactivé et rien n'est écrit.
+    """
+
+    def __init__(self, directory, max_bytes, extension=".glb"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(image_bytes: bytes, scale: float, params: dict) -> str:
+        """Construit la clé de cache à partir de l'image, de l'échelle et des paramètres."""
+        h = hashlib.sha256()
+        h.update(hash_bytes(image_bytes).encode())
+        h.update(repr(float(scale)).encode())
+        h.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def path_for(self, key: str) -> str:
+        """Chemin où le résultat de la clé est stocké (à lire, pas à écrire directement)."""
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f"{key}{self.extension}")
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def get(self, key: str):
+        """Retourne le chemin du résultat en cache, ou None en cas d'absence."""
+        if not self.enabled:
+            self.misses += 1
+            return None
+        path = self.path_for(key)
+        with self._lock:
+            if os.path.exists(path):
+                self.hits += 1
+                # Mettre à jour la date d'accès pour la politique LRU
+                os.utime(path)
+                return path
+            self.misses += 1
+            return None
+
+    def _commit(self, key: str):
+        """
+        Marque l'entrée comme récente et applique l'éviction.
+
+        Appelée uniquement après `write_atomic` : aucun fichier n'est écrit
+        directement à path_for(key), où un `get` concurrent (ou un arrêt en
+        cours d'écriture) exposerait un fichier incomplet.
+        """
+        with self._lock:
+            path = self.path_for(key)
+            if os.path.exists(path):
+                os.utime(path)
+            self._evict()
+        return path
+
+    def load_bytes(self, key: str):
+        """Retourne le contenu du résultat en cache, ou None."""
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def store_bytes(self, key: str, data: bytes):
+        """
+        Écrit le résultat sur disque (seule écriture du GLB généré) puis
+        applique l'éviction. Ne fait rien si le cache est désactivé (max_bytes = 0).
+        """
+        if not self.enabled:
+            return None
+        write_atomic(self.path_for(key), lambda f: f.write(data))
+        return self._commit(key)
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.extension):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        # Toujours garder le fichier le plus récent, même s'il dépasse la limite
+        while total > self.max_bytes and len(entries) > 1:
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            my_logger.info(f"Cache : suppression de {path}")
+
+    def stats(self):
+        entries = self._entries() if os.path.isdir(self.directory) else []
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "size_bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+
+class DetectionCache(ResultCache):
+    """
+    Cache des bounding boxes après `bbox_pipeline`, par image.
+
+    Les boxes ne dépendent pas de l'échelle : un plan renvoyé avec d'autres
+    points de calibration réutilise les détections sans relancer RFDETR.
+    """
+
+    def __init__(self, directory, max_bytes):
+        super().__init__(directory, max_bytes, extension=".json")
+
+    @staticmethod
+    def make_key(image_bytes: bytes, params: dict) -> str:
+        """Construit la clé à partir de l'image et des paramètres de détection."""
+        h = hashlib.sha256()
+        h.update(hash_bytes(image_bytes).encode())
+        h.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def load(self, key: str):
+        """Retourne le dictionnaire de boxes en cache, ou None."""
+        path = self.get(key)
+        if path is None:
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def store(self, key: str, bbox: dict):
+        """Enregistre le dictionnaire de boxes."""
+        if not self.enabled:
+            return
+        write_atomic(self.path_for(key), lambda f: json.dump(bbox, f), mode="w")
+        self._commit(key)
+
+
+class GeometryCache(ResultCache):
+    """
+    Cache des extrusions triangulées, par empreinte de polygone.
+
+    La clé est le WKB du polygone normalisé (ordre des sommets et des anneaux
+    canonique), la hauteur d'extrusion et le moteur de triangulation. Chaque
+    entrée est un seul fichier .npy float64 : une ligne d'en-tête
+    [nb_sommets, nb_faces, 0], puis les sommets, puis les faces. Il est relu en
+    mémoire mappée (copie à l'écriture), sans désérialisation.
+
+    Seules les extrusions passent par ce cache (murs des découpes booléennes,
+    sols) : les murs découpés par analytic_cut (cut_mode "analytic") sont
+    recalculés à chaque fois.
+    """
+
+    def __init__(self, directory, max_bytes):
+        super().__init__(directory, max_bytes, extension=".npy")
+
+    @staticmethod
+    def make_keys(polygons, height, engine):
+        """Clés de cache d'une liste de polygones extrudés à la même hauteur."""
+        wkbs = shapely.to_wkb(shapely.normalize(np.asarray(polygons, dtype=object)))
+        suffix = f"{float(height)!r}:{engine}".encode()
+        return [hash_bytes(wkb + suffix) for wkb in wkbs]
+
+    def load(self, key: str):
+        """Retourne (vertices, faces) en cache, ou None."""
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            data = np.load(path, mmap_mode="c")
+        except (OSError, ValueError) as e:
+            my_logger.warning(f"Cache de géométrie illisible {path} : {e}")
+            return None
+        n_vertices, n_faces = int(data[0, 0]), int(data[0, 1])
+        vertices = data[1 : 1 + n_vertices]
+        faces = data[1 + n_vertices : 1 + n_vertices + n_faces].astype(np.int64)
+        return vertices, faces
+
+    def store_all(self, entries):
+        """Enregistre les (clé, vertices, faces) puis applique l'éviction une fois."""
+        if not entries:
+            return
+        for key, vertices, faces in entries:
+            data = np.empty((1 + len(vertices) + len(faces), 3), dtype=np.float64)
+            data[0] = (len(vertices), len(faces), 0)
+            data[1 : 1 + len(vertices)] = vertices
+            data[1 + len(vertices) :] = faces
+            write_atomic(self.path_for(key), lambda f: np.save(f, data))
+        with self._lock:
+            self._evict()
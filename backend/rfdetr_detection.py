@@ -1,18 +1,51 @@
-from rfdetr import RFDETRBase
-from rfdetr.util.coco_classes import COCO_CLASSES
-import supervision as sv
 import numpy as np
 from PIL import Image
-import cv2
 from my_logger import my_logger
 
-from constants import CHECKPOINTS
+from constants import CHECKPOINTS, DETECTION_MAX_BATCH_SIZE, DETECTION_MAX_WAIT_MS
+from model_registry import registry
+from detection_service import DetectionBatcher
 
-my_logger.info("Importation de RFDETR pour la détection d'objets.")
+RFDETR_CHECKPOINT = f"{CHECKPOINTS}/cubicasa5k-rfdetr-wall-window-door-v3.pt"
+DETECTION_THRESHOLD = 0.4
+
+
+def load_rfdetr_model():
+    """Charge le modèle RFDETR pré-entraîné sur CubiCasa5k."""
+    # rfdetr (et torch) ne sont importés qu'au premier chargement du modèle
+    my_logger.info("Importation de RFDETR pour la détection d'objets.")
+    from rfdetr import RFDETRBase
+
+    return RFDETRBase(
+        pretrain_weights=RFDETR_CHECKPOINT,
+        num_classes=3,
+    )
+
+
+def warmup_rfdetr_model(model):
+    """Effectue une première prédiction sur une image vide pour initialiser le modèle."""
+    model.predict(Image.new("RGB", (640, 640), "white"), threshold=DETECTION_THRESHOLD)
+
+
+registry.register(
+    "rfdetr",
+    load_rfdetr_model,
+    checkpoint_path=RFDETR_CHECKPOINT,
+    warmup=warmup_rfdetr_model,
+)
+
+detector = DetectionBatcher(
+    lambda: registry.get("rfdetr"),
+    max_batch_size=DETECTION_MAX_BATCH_SIZE,
+    max_wait_ms=DETECTION_MAX_WAIT_MS,
+    threshold=DETECTION_THRESHOLD,
+)
 
 
 def rfdetr_locally_detection(image_path):
     """Détection d'objets avec RFDETR localement."""
+    import supervision as sv
+
     image = Image.open(image_path).convert("RGB")  # Convertir en format RGB
     # image = cv2.imread(image_path)
 
@@ -23,14 +56,8 @@ def rfdetr_locally_detection(image_path):
         3: "window",
     }
 
-    # Charger le modèle pré-entraîné
-    model = RFDETRBase(
-        pretrain_weights=f"{CHECKPOINTS}/cubicasa5k-rfdetr-wall-window-door-v3.pt",
-        num_classes=3,
-    )
-
-    # Effectuer la prédiction
-    detections = model.predict(image, threshold=0.4)
+    # Effectuer la prédiction (regroupée avec les requêtes concurrentes)
+    detections = detector.predict(image)
 
     # Préparer les annotateurs pour dessiner les boîtes et les labels
     color = sv.ColorPalette.from_hex(
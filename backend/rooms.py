@@ -1,31 +1,58 @@
-from shapely.geometry import Polygon, MultiPolygon, box
-from shapely.ops import unary_union
+import numpy as np
+import shapely
+from shapely.geometry import box
+
+# Une région plus petite, ou plus fine en moyenne (2 * aire / périmètre),
+# n'est pas une pièce mais un interstice entre deux murs (en pixels du plan)
+ROOM_MIN_AREA = 1000
+ROOM_MIN_WIDTH = 10
+
+
+def extract_room_polygons(wall_polygons, min_area=ROOM_MIN_AREA, min_width=ROOM_MIN_WIDTH):
+    """
+    Retourne les polygones des pièces (zones fermées par les murs).
+
+    `wall_polygons` sont les composantes disjointes de l'union des murs déjà
+    calculée par generate_wall_polygon_from_bbox : l'union n'est pas refaite.
+    Les faces intérieures du plan sont exactement les trous de ces
+    composantes ; ils sont tous extraits en une passe vectorisée, puis les
+    murs isolés qui tombent dans une pièce en sont retirés. La zone extérieure
+    au bâtiment n'est jamais un trou et n'apparaît donc pas. Les interstices
+    (aire < min_area ou largeur moyenne < min_width) sont ignorés.
+    """
+    walls = np.asarray([p for p in wall_polygons if not p.is_empty], dtype=object)
+    if len(walls) == 0:
+        return []
 
+    counts = shapely.get_num_interior_rings(walls)
+    if counts.sum() == 0:
+        return []
+    owner = np.repeat(np.arange(len(walls)), counts)
+    ring_index = np.concatenate([np.arange(count) for count in counts])
+    rooms = shapely.polygons(shapely.get_interior_ring(walls[owner], ring_index))
 
-def extract_room_polygons(wall_polygons):
-    """Retourne les polygones des pièces (zones libres)."""
-    walls_union = unary_union(wall_polygons)
+    # Murs isolés à l'intérieur d'une pièce : un point d'un mur dans un trou
+    # d'une autre composante implique que tout le mur y est. On retire tout
+    # son contour extérieur, ses propres trous étant déjà des pièces.
+    points = shapely.point_on_surface(walls)
+    wall_idx, room_idx = shapely.STRtree(rooms).query(points, predicate="within")
+    for room in np.unique(room_idx):
+        inner = walls[wall_idx[room_idx == room]]
+        inner = shapely.polygons(shapely.get_exterior_ring(inner))
+        rooms[room] = rooms[room].difference(shapely.union_all(inner))
 
-    # Créer un gros rectangle englobant tout le plan
-    minx, miny, maxx, maxy = walls_union.bounds
-    marge = 0
-    envelope = box(minx - marge, miny - marge, maxx + marge, maxy + marge)  # marge
+    rooms = shapely.get_parts(rooms)
+    area = shapely.area(rooms)
+    width = 2 * area / np.maximum(shapely.length(rooms), 1e-9)
+    keep = (area >= min_area) & (width >= min_width)
 
-    # Les pièces sont les zones libres à l'intérieur des murs
-    free_space = envelope.difference(walls_union)
-
-    if isinstance(free_space, Polygon):
-        return [free_space]
-    elif isinstance(free_space, MultiPolygon):
-        return list(free_space.geoms)
-    else:
-        return []
+    return list(rooms[keep])
 
 
 import trimesh
-import numpy as np
 import random
-from PIL import Image
+from assets import texture_assets
+from extrusion_pool import extrude_polygons
 
 
 def create_floor_meshes_with_texture(
@@ -44,13 +71,14 @@ def create_floor_meshes_with_texture(
 
     floor_meshes.append(mesh)
 
-    # Créer un mesh pour chaque pièce
-    for idx, room_polygon in enumerate(rooms_polygons):
-        if not room_polygon.is_valid:
-            room_polygon = room_polygon.buffer(0)
+    # Créer le mesh du sol de chaque pièce (en parallèle pour les grands plans)
+    room_meshes = extrude_polygons(
+        [p if p.is_valid else p.buffer(0) for p in rooms_polygons], 5, engine=None
+    )
 
-        # Créer le mesh du sol
-        mesh = trimesh.creation.extrude_polygon(room_polygon, height=5)
+    for idx, mesh in enumerate(room_meshes):
+        if isinstance(mesh, Exception):
+            raise mesh
         mesh.apply_translation((0, 0, 0))  # Légèrement en dessous des murs
 
         # Générer les coordonnées UV (simple mapping XY -> UV [0,1])
@@ -59,13 +87,11 @@ def create_floor_meshes_with_texture(
         max_xy = vertices.max(axis=0)
         uv = (vertices - min_xy) / (max_xy - min_xy + 1e-8)  # UV entre 0 et 1
 
-        # Choisir une texture aléatoire et la charger avec PIL
+        # Choisir une texture aléatoire ; le matériau est partagé entre les pièces
         texture_path = random.choice(textures_paths)
         # texture_path = textures_paths[2]
-        image = Image.open(texture_path)
-
-        material = trimesh.visual.texture.SimpleMaterial(image=image)
-        visual = trimesh.visual.TextureVisuals(uv=uv, image=image, material=material)
+        material = texture_assets.material(texture_path)
+        visual = trimesh.visual.TextureVisuals(uv=uv, material=material)
 
         mesh.visual = visual
         mesh.visual.name = f"Floor_{idx}"
@@ -1,11 +1,14 @@
-import matplotlib.pyplot as plt
-import matplotlib.image as mpimg
+from PIL import Image
 from constants import DATASET
 import numpy as np
 
 
 def show_scale_points_on_image(image_path, point1, point2):
     """Affiche deux points sur une image pour vérifier la distance utilisée comme référence d'échelle."""
+    # matplotlib n'est importé que pour ce tracé de débogage
+    import matplotlib.pyplot as plt
+    import matplotlib.image as mpimg
+
     # Charger l'image
     img = mpimg.imread(image_path)
     print(img.shape)
@@ -36,10 +39,9 @@ def show_scale_points_on_image(image_path, point1, point2):
 
 def compute_scale(image_path, point1, point2, real_distance_m):
     """Calcule l'échelle en mètres par pixel."""
-    # Charger l'image
-    img = mpimg.imread(image_path)
-
-    print(f"Image shape: {img.shape}")
+    # Lire seulement l'en-tête de l'image pour connaître sa taille
+    with Image.open(image_path) as img:
+        print(f"Image size: {img.size}")
     print("Points:", point1, point2)
 
     # Calculer la distance en pixels entre les deux points
@@ -0,0 +1,179 @@
+import bisect
+import contextvars
+import cProfile
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from my_logger import my_logger
+
+# Bornes (en secondes) des histogrammes de durée
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    """Histogramme cumulatif au format Prometheus, une série par valeur de label."""
+
+    def __init__(self, name, help_text, label, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        with self._lock:
+            counts, total = self._series.get(
+                label_value, ([0] * (len(self.buckets) + 1), 0.0)
+            )
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._series[label_value] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        for label_value, (counts, total) in sorted(series.items()):
+            labels = f'{self.label}="{label_value}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Compteur au format Prometheus, une série par valeur de label."""
+
+    def __init__(self, name, help_text, label):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value, value=1):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for label_value, value in sorted(values.items()):
+            lines.append(f'{self.name}{{{self.label}="{label_value}"}} {value}')
+        return lines
+
+
+stage_duration = Histogram(
+    "floorplan_stage_duration_seconds", "Durée de chaque étape de la génération.", "stage"
+)
+request_duration = Histogram(
+    "floorplan_request_duration_seconds", "Durée des requêtes HTTP.", "path"
+)
+pipeline_items = Counter(
+    "floorplan_pipeline_items_total",
+    "Éléments traités (boxes par classe, polygones, triangles, cutters, octets).",
+    "kind",
+)
+
+
+class Trace:
+    """Spans et compteurs d'une génération (une requête ou un job)."""
+
+    def __init__(self, name):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.spans = []
+        self.counts = {}
+        self.profile_path = None
+
+    def summary(self):
+        spans = ", ".join(f"{name} {duration * 1000:.1f} ms" for name, duration in self.spans)
+        counts = ", ".join(f"{key}={value}" for key, value in self.counts.items())
+        summary = f"[{self.name} {self.trace_id[:8]}] {spans} | {counts}"
+        if self.profile_path is not None:
+            summary += f" | profil : {self.profile_path}"
+        return summary
+
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def trace(name, profile_dir=None):
+    """
+    Ouvre une trace pour la génération en cours.
+
+    Les `span` et `count` appelés dans ce bloc (y compris dans les fonctions
+    appelées) y sont rattachés ; un résumé est journalisé à la fin. Avec
+    `profile_dir`, le bloc est aussi profilé avec cProfile et le profil est
+    écrit dans `profile_dir/<trace_id>.prof` (lisible avec pstats ou snakeviz).
+    """
+    current = Trace(name)
+    token = _current_trace.set(current)
+    profiler = cProfile.Profile() if profile_dir else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield current
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(profile_dir, exist_ok=True)
+            current.profile_path = os.path.join(profile_dir, f"{current.trace_id}.prof")
+            profiler.dump_stats(current.profile_path)
+        _current_trace.reset(token)
+        my_logger.info(current.summary())
+
+
+@contextmanager
+def span(name):
+    """Mesure la durée du bloc, l'ajoute à l'histogramme et à la trace en cours."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        stage_duration.observe(name, duration)
+        current = _current_trace.get()
+        if current is not None:
+            current.spans.append((name, duration))
+
+
+@contextmanager
+def stage(name, progress=None):
+    """Signale le début de l'étape à `progress` (API /jobs/) puis la mesure comme un span."""
+    if progress is not None:
+        progress(name)
+    with span(name):
+        yield
+
+
+def count(kind, value):
+    """Ajoute `value` au compteur `kind` (et à la trace en cours)."""
+    value = int(value)
+    pipeline_items.inc(kind, value)
+    current = _current_trace.get()
+    if current is not None:
+        current.counts[kind] = current.counts.get(kind, 0) + value
+
+
+def render_metrics(gauges=None):
+    """Toutes les métriques au format texte Prometheus, plus les jauges données."""
+    lines = []
+    for metric in (stage_duration, request_duration, pipeline_items):
+        lines.extend(metric.render())
+    for name, (help_text, value) in (gauges or {}).items():
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"])
+    return "\n".join(lines) + "\n"
@@ -1,13 +1,11 @@
 import trimesh
-import matplotlib.pyplot as plt
 from shapely.geometry import (
     box as shapely_box,
     MultiPolygon,
     GeometryCollection,
     Polygon,
 )
-import matplotlib.patches as patches
-import matplotlib.image as mpimg
+from box_index import best_overlap_match
 
 
 def process_polygons(polygons):
@@ -38,6 +36,17 @@ def bbox_intersection_area(bbox1, bbox2):
     return poly1.intersection(poly2).area
 
 
+def find_best_walls(element_bboxes, wall_bboxes):
+    """
+    Trouve, pour chaque élément (porte ou fenêtre), l'indice du mur avec le plus
+    grand chevauchement, en une seule passe vectorisée (None si aucun mur).
+    """
+    return [
+        int(idx) if idx >= 0 else None
+        for idx in best_overlap_match(element_bboxes, wall_bboxes)
+    ]
+
+
 def find_best_wall_by_intersection(
     element_bbox,
     wall_bboxes,
@@ -50,19 +59,14 @@ def find_best_wall_by_intersection(
     Trouve le mur qui a le plus grand chevauchement avec un élément (porte ou fenêtre).
     Peut afficher les résultats si visualize=True.
     """
-    max_intersection = 0
-    best_idx = None
-    for idx, wall_bbox in enumerate(wall_bboxes):
-        area = bbox_intersection_area(element_bbox, wall_bbox)
-        if area > max_intersection:
-            max_intersection = area
-            best_idx = idx
+    best_idx = find_best_walls([element_bbox], wall_bboxes)[0]
 
     if best_idx is None:
         print("Aucune intersection trouvée.")
         return None
 
     best_wall_bbox = wall_bboxes[best_idx]
+    max_intersection = bbox_intersection_area(element_bbox, best_wall_bbox)
 
     if visualize:
         print(
@@ -72,6 +76,11 @@ def find_best_wall_by_intersection(
     if not visualize:
         return best_idx
 
+    # matplotlib n'est importé que pour ce tracé de débogage
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as patches
+    import matplotlib.image as mpimg
+
     # Plot
     fig, ax = plt.subplots()
 
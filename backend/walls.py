@@ -1,35 +1,58 @@
 import trimesh
+import shapely
 import numpy as np
 from PIL import Image
-from shapely.geometry import box, Polygon
+from shapely.geometry import Polygon
 from trimesh.creation import extrude_polygon
 
 
 def generate_wall_polygon_from_bbox(wall_bbox):
-    wall_polygon = Polygon()
-    for (x_min, y_min, x_max, y_max) in wall_bbox:
-
-        bbox_width = x_max - x_min
-        bbox_height = y_max - y_min
-        walls = box(x_min, -y_min, (x_min + bbox_width + 2), -(y_min + bbox_height + 2))
+    """
+    Construit l'empreinte 2D des murs (union de toutes les boxes).
 
-        wall_polygon = wall_polygon.union(walls)
+    Les boxes sont créées en une seule fois à partir d'un tableau NumPy puis
+    fusionnées par une seule union en cascade, au lieu d'une union par mur.
+    L'axe Y est inversé (repère image -> repère 3D) et chaque box est élargie
+    de 2 pixels pour que les murs adjacents se touchent.
+    """
+    boxes = np.asarray(wall_bbox, dtype=float).reshape(-1, 4)
+    if len(boxes) == 0:
+        return Polygon()
+
+    x_min, y_min, x_max, y_max = boxes.T
+    bbox_width = x_max - x_min
+    bbox_height = y_max - y_min
+    walls = shapely.box(
+        x_min, -y_min, (x_min + bbox_width + 2), -(y_min + bbox_height + 2)
+    )
 
-    return wall_polygon
+    return shapely.union_all(walls)
 
 
-def extrude_polygon(polygon, height):
+def extrude_polygon(polygon, height, engine="triangle"):
     """Extrait un polygone 2D et l'extrude pour créer une forme 3D à l'échelle réelle."""
 
     if not polygon.is_valid:
         polygon = polygon.buffer(0)
 
     # Extrusion avec la hauteur réelle (en mètres)
-    mesh = trimesh.creation.extrude_polygon(polygon, height, engine="triangle")
+    mesh = trimesh.creation.extrude_polygon(polygon, height, engine=engine)
 
     return mesh
 
 
+def extrude_arrays(polygon, height, engine="triangle"):
+    """
+    Comme extrude_polygon, mais retourne (vertices, faces) ou l'exception
+    levée : c'est la tâche envoyée aux processus de extrusion_pool.
+    """
+    try:
+        mesh = extrude_polygon(polygon, height, engine)
+        return np.asarray(mesh.vertices), np.asarray(mesh.faces)
+    except Exception as e:
+        return e
+
+
 def add_texture_to_mesh(mesh, texture_path):
     """
     Ajoute une texture à une mesh en projetant les coordonnées XY.
@@ -58,15 +81,16 @@ def create_wall_meshes(polygons, wall_height, real_word_scale):
     if not polygons:
         raise ValueError("Aucun polygone à traiter.")
 
+    from extrusion_pool import extrude_polygons
+
     wall_meshes = []
 
-    for idx, polygon in enumerate(polygons):
-        try:
-            mesh = extrude_polygon(polygon, height=wall_height)
-            mesh.apply_scale(real_word_scale)
-            mesh.visual.name = f"Wall_{idx}"
-            wall_meshes.append(mesh)
-        except Exception as e:
-            print(f"Erreur lors de l'extrusion du polygone {idx}: {e}")
+    for idx, mesh in enumerate(extrude_polygons(polygons, wall_height)):
+        if isinstance(mesh, Exception):
+            print(f"Erreur lors de l'extrusion du polygone {idx}: {mesh}")
+            continue
+        mesh.apply_scale(real_word_scale)
+        mesh.visual.name = f"Wall_{idx}"
+        wall_meshes.append(mesh)
 
     return trimesh.util.concatenate(wall_meshes)
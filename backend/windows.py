@@ -1,6 +1,8 @@
 import trimesh
 import numpy as np
-from utils import load_mesh_safe, find_best_wall_by_intersection
+from utils import find_best_walls
+from assets import mesh_assets, MeshInstance
+from openings import cut_openings
 
 
 def generate_window_cut_or_instance(
@@ -16,8 +18,12 @@ def generate_window_cut_or_instance(
     mode,
     wall_bbox,
 ):
-    """Génère un box pour découper ou une instance de porte à placer."""
-    window_model = window_model.copy()
+    """
+    Génère un box pour découper ou la matrice de placement d'une fenêtre.
+
+    En mode "instance", le modèle partagé n'est pas copié : on retourne la
+    transformation 4x4 (échelle, rotation, translation) à lui appliquer.
+    """
 
     x_center = ((x_min + x_max) / 2) * real_world_scale
     y_center = ((y_min + y_max) / 2) * real_world_scale
@@ -56,29 +62,32 @@ def generate_window_cut_or_instance(
         return box
 
     elif mode == "instance":
-        window_instance = window_model.copy()
-        # change size of the door based on real_world_scale
-        window_instance.apply_scale(window_scale)
+        # change size of the window based on real_world_scale
+        transform = trimesh.transformations.scale_matrix(window_scale)
         if is_vertical:
-            window_instance.apply_transform(
+            transform = (
                 trimesh.transformations.rotation_matrix(np.radians(90), [0, 0, 1])
+                @ transform
+            )
+        transform = (
+            trimesh.transformations.translation_matrix(
+                (x_center, -y_center, up + window_offset)
             )
-        window_instance.apply_translation((x_center, -y_center, up + window_offset))
-        return window_instance
+            @ transform
+        )
+        return transform
 
 
-def cut_and_place_windows(
-    wall_mesh,
-    window_path,
-    windows_bbox,
-    wall_bboxes,
-    wall_height,
-    window_scale,
-    real_world_scale,
-    image_path,
+def place_windows(
+    window_path, windows_bbox, wall_bboxes, wall_height, window_scale, real_world_scale
 ):
-    """Découpe les murs et place les portes."""
-    window_model = load_mesh_safe(window_path)
+    """
+    Calcule les boxes de découpe et les instances des fenêtres, sans toucher aux murs.
+
+    Returns:
+        tuple: (boxes de découpe, instances de fenêtres)
+    """
+    window_model = mesh_assets.get(window_path)
 
     if "small" in window_path.lower():
         window_offset = 0.1
@@ -88,14 +97,11 @@ def cut_and_place_windows(
     cut_boxes = []
     placed_window = []
 
+    # Associer chaque fenêtre à son mur en une seule passe
+    wall_indices = find_best_walls(windows_bbox, wall_bboxes)
+
     for i, bbox in enumerate(windows_bbox):
-        wall_idx = find_best_wall_by_intersection(
-            bbox,
-            wall_bboxes,
-            element_type="window",
-            image_path=image_path,
-            visualize=False,
-        )
+        wall_idx = wall_indices[i]
         wall_bbox = wall_bboxes[wall_idx] if wall_idx is not None else None
 
         # Générer le trou
@@ -111,8 +117,8 @@ def cut_and_place_windows(
         )
         cut_boxes.append(box_cut)
 
-        # # Générer l'instance
-        window_instance = generate_window_cut_or_instance(
+        # Générer l'instance (modèle partagé + transformation)
+        window_transform = generate_window_cut_or_instance(
             *bbox,
             window_model,
             window_scale,
@@ -122,13 +128,31 @@ def cut_and_place_windows(
             mode="instance",
             wall_bbox=wall_bbox,
         )
+        placed_window.append(
+            MeshInstance(f"Window_{i}", window_model, window_transform)
+        )
 
-        window_instance.visual.name = f"Window_{i}"
-        placed_window.append(window_instance)
+    return cut_boxes, placed_window
 
-    if cut_boxes:
-        cut_union = trimesh.util.concatenate(cut_boxes)
-        wall_mesh = trimesh.boolean.boolean_manifold(
-            [wall_mesh, cut_union], operation="difference", check_volume=False
-        )
+
+def cut_and_place_windows(
+    wall_mesh,
+    window_path,
+    windows_bbox,
+    wall_bboxes,
+    wall_height,
+    window_scale,
+    real_world_scale,
+    image_path,
+):
+    """Découpe les murs et place les fenêtres."""
+    cut_boxes, placed_window = place_windows(
+        window_path,
+        windows_bbox,
+        wall_bboxes,
+        wall_height,
+        window_scale,
+        real_world_scale,
+    )
+    wall_mesh = cut_openings(wall_mesh, cut_boxes)
     return wall_mesh, placed_window
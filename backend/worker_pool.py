@@ -0,0 +1,62 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
+class PoolFullError(Exception):
+    """Levée quand la file d'attente du pool de travail est pleine."""
+
+
+class WorkerPool:
+    """
+    Exécute les traitements lourds (détection, génération 3D, classification)
+    hors de la boucle d'événements.
+
+    Le pool accepte au plus `max_workers` tâches en cours plus `max_queue`
+    tâches en attente. Au-delà, `run` lève `PoolFullError` au lieu de
+    mettre la requête en file indéfiniment.
+    """
+
+    def __init__(self, max_workers=2, max_queue=8):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="worker"
+        )
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """Nombre de tâches en cours ou en attente."""
+        return self._pending
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def submit(self, func, *args, **kwargs):
+        """Soumet une tâche et retourne un concurrent.futures.Future."""
+        if not self._slots.acquire(blocking=False):
+            raise PoolFullError(
+                f"Pool saturé ({self.max_workers} en cours, {self.max_queue} en attente)"
+            )
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(partial(func, *args, **kwargs))
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, func, *args, **kwargs):
+        """Exécute func(*args, **kwargs) dans le pool et attend son résultat."""
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
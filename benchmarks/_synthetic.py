@@ -0,0 +1,105 @@
+"""
+Plans synthétiques et mesure du temps communs aux benchmarks.
+
+Les coordonnées sont en pixels, comme les boxes détectées par RF-DETR.
+"""
+
+import time
+
+import numpy as np
+
+ROOM = 400  # taille d'une pièce en pixels
+THICKNESS = 12  # épaisseur des murs en pixels
+
+
+def grid_walls(rooms, origin=(0, 0)):
+    """Boxes des murs d'une grille de rooms x rooms pièces, coin en `origin`."""
+    ox, oy = origin
+    size = rooms * ROOM
+    walls = []
+    for k in range(rooms + 1):
+        walls.append([ox, oy + k * ROOM, ox + size + THICKNESS, oy + k * ROOM + THICKNESS])
+        walls.append([ox + k * ROOM, oy, ox + k * ROOM + THICKNESS, oy + size + THICKNESS])
+    return walls
+
+
+def grid_plan(rooms):
+    """
+    Grille de rooms x rooms pièces, une porte et une fenêtre par segment de mur.
+
+    Returns:
+        tuple: (boxes des murs, portes, fenêtres), chaque ouverture étant
+        ((x, y) de son centre, True si le mur est vertical).
+    """
+    doors, windows = [], []
+    for k in range(rooms + 1):
+        for r in range(rooms):
+            offset = r * ROOM
+            # Murs horizontaux : porte puis fenêtre
+            y = k * ROOM + THICKNESS / 2
+            doors.append(((offset + 100, y), False))
+            windows.append(((offset + 280, y), False))
+            # Murs verticaux
+            x = k * ROOM + THICKNESS / 2
+            doors.append(((x, offset + 280), True))
+            windows.append(((x, offset + 100), True))
+    return grid_walls(rooms), doors, windows
+
+
+def irregular_plan(rooms, jitter=4.0, seed=0):
+    """
+    La grille de grid_plan telle que la détecte RF-DETR : une box par segment
+    de mur entre deux croisements, dont chaque bord est décalé au hasard d'au
+    plus `jitter` pixels. Les coordonnées ne sont donc ni entières ni alignées
+    d'un mur à l'autre.
+
+    Returns:
+        tuple: (boxes des murs, portes, fenêtres), au format de grid_plan.
+    """
+    rng = np.random.default_rng(seed)
+
+    def shake(*values):
+        return [value + rng.uniform(-jitter, jitter) for value in values]
+
+    walls, doors, windows = [], [], []
+    for k in range(rooms + 1):
+        for r in range(rooms):
+            offset = r * ROOM
+            # Mur horizontal entre les croisements (r, k) et (r + 1, k)
+            x0, x1 = shake(offset, offset + ROOM + THICKNESS)
+            y0, y1 = shake(k * ROOM, k * ROOM + THICKNESS)
+            walls.append([x0, y0, x1, y1])
+            doors.append((shake(offset + 100, (y0 + y1) / 2), False))
+            windows.append((shake(offset + 280, (y0 + y1) / 2), False))
+            # Mur vertical entre les croisements (k, r) et (k, r + 1)
+            x0, x1 = shake(k * ROOM, k * ROOM + THICKNESS)
+            y0, y1 = shake(offset, offset + ROOM + THICKNESS)
+            walls.append([x0, y0, x1, y1])
+            doors.append((shake((x0 + x1) / 2, offset + 280), True))
+            windows.append((shake((x0 + x1) / 2, offset + 100), True))
+    return walls, doors, windows
+
+
+def crossing_walls(n, seed=0):
+    """N murs horizontaux et verticaux de longueur aléatoire qui se croisent."""
+    rng = np.random.default_rng(seed)
+    side = int(np.ceil(np.sqrt(n)))
+    boxes = []
+    for i in range(n):
+        cx, cy = (i % side) * 200, (i // side) * 200
+        length = rng.uniform(150, 260)
+        if i % 2:
+            boxes.append([cx, cy, cx + length, cy + 12])
+        else:
+            boxes.append([cx, cy, cx + 12, cy + length])
+    return boxes
+
+
+def timed(func, *args, repeat=1, **kwargs):
+    """Appelle func `repeat` fois ; retourne (dernier résultat, meilleure durée en s)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return result, best
@@ -0,0 +1,109 @@
+"""
+Benchmark de l'extrusion des polygones (murs et sols) sur 1 à N processus.
+
+Génère une grille de bâtiments séparés (une composante de mur par bâtiment,
+chaque pièce donnant un sol), puis extrude murs et sols avec
+extrusion_pool.extrude_polygons pour chaque nombre de processus. Les meshes
+obtenus doivent être identiques, dans le même ordre, à ceux de l'extrusion
+séquentielle.
+
+Le dernier passage mesure le cache de géométrie (extrusion puis relecture).
+
+Usage (depuis la racine du dépôt) :
+    python benchmarks/bench_extrusion.py --buildings 8 --processes 1 2 4 8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from shapely.geometry import box
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import extrusion_pool  # noqa: E402
+from result_cache import GeometryCache  # noqa: E402
+from walls import generate_wall_polygon_from_bbox  # noqa: E402
+from utils import process_polygons  # noqa: E402
+from _synthetic import ROOM, THICKNESS, grid_walls  # noqa: E402
+
+ROOMS = 4  # pièces par côté dans chaque bâtiment
+WALL_HEIGHT = 240
+
+
+def synthetic_plan(buildings):
+    """Grille de buildings x buildings bâtiments de ROOMS x ROOMS pièces."""
+    size = ROOMS * ROOM
+    walls, rooms = [], []
+    for bx in range(buildings):
+        for by in range(buildings):
+            ox, oy = bx * (size + 2 * ROOM), by * (size + 2 * ROOM)
+            walls.extend(grid_walls(ROOMS, origin=(ox, oy)))
+            for i in range(ROOMS):
+                for j in range(ROOMS):
+                    x, y = ox + i * ROOM + THICKNESS + 2, oy + j * ROOM + THICKNESS + 2
+                    rooms.append(box(x, -y, x + ROOM - THICKNESS - 2, -(y + ROOM - THICKNESS - 2)))
+    return walls, rooms
+
+
+def run(polygons, rooms, processes, use_cache=False):
+    start = time.perf_counter()
+    walls = extrusion_pool.extrude_polygons(
+        polygons, WALL_HEIGHT, processes=processes, min_vertices=0, use_cache=use_cache
+    )
+    floors = extrusion_pool.extrude_polygons(
+        rooms, 5, engine=None, processes=processes, min_vertices=0, use_cache=use_cache
+    )
+    return walls + floors, time.perf_counter() - start
+
+
+def check_same(reference, meshes, label):
+    for expected, mesh in zip(reference, meshes):
+        if not (
+            np.array_equal(expected.vertices, mesh.vertices)
+            and np.array_equal(expected.faces, mesh.faces)
+        ):
+            raise AssertionError(f"{label} : meshes différents")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--buildings", type=int, default=6, help="Bâtiments par côté")
+    parser.add_argument(
+        "--processes", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    wall_bbox, rooms = synthetic_plan(args.buildings)
+    polygons = process_polygons(generate_wall_polygon_from_bbox(wall_bbox))
+    print(f"{len(polygons)} composantes de mur, {len(rooms)} pièces, {os.cpu_count()} coeurs")
+
+    reference, _ = run(polygons, rooms, 1)
+    for processes in sorted(set(args.processes)):
+        # Premier appel hors mesure : démarrage des processus
+        run(polygons, rooms, processes)
+        durations = []
+        for _ in range(args.repeat):
+            meshes, duration = run(polygons, rooms, processes)
+            durations.append(duration)
+        check_same(reference, meshes, f"{processes} processus")
+        print(f"{processes:>3} processus {min(durations) * 1000:>10.1f} ms")
+
+    # Cache de géométrie : premier passage (remplissage) puis relecture
+    with tempfile.TemporaryDirectory() as directory:
+        extrusion_pool.geometry_cache = GeometryCache(directory, max_bytes=1024**3)
+        _, cold = run(polygons, rooms, 1, use_cache=True)
+        meshes, warm = run(polygons, rooms, 1, use_cache=True)
+        check_same(reference, meshes, "cache")
+        print(f"cache vide     {cold * 1000:>10.1f} ms")
+        print(f"cache rempli   {warm * 1000:>10.1f} ms")
+
+    extrusion_pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark et vérification de la découpe des ouvertures dans les murs.
+
+Compare, sur deux plans synthétiques de pièces avec portes et fenêtres :
+    - "two_pass"   : ancienne découpe (une différence pour les portes, une pour les fenêtres)
+    - "single"     : une seule différence booléenne (cut_openings, mode par défaut)
+    - "per_component" : une différence par composante de mur touchée
+    - "analytic"   : découpe 2D sans booléen 3D (cut_openings_analytic)
+    - "analytic_unguarded" : la même, sans le repli vers la découpe booléenne
+      des polygones dont la grille est trop fine (ANALYTIC_CUT_MAX_CELL_RATIO)
+
+Le plan "grille" a tous ses murs alignés ; le plan "irrégulier" a une box
+par segment de mur aux bords décalés de quelques pixels, comme les
+détections réelles. La découpe analytique n'est rapide que sur le premier.
+
+Le volume et la surface des murs obtenus doivent être identiques à ceux de la
+découpe booléenne (à la précision float32 de Manifold près). La découpe
+analytique doit en plus donner des solides fermés, sans plus de faces que
+la découpe booléenne.
+
+Usage (depuis la racine du dépôt) :
+    python benchmarks/bench_openings.py --rooms 6
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import trimesh
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from walls import generate_wall_polygon_from_bbox, create_wall_meshes  # noqa: E402
+from utils import process_polygons  # noqa: E402
+import openings  # noqa: E402
+from openings import cut_openings, cut_openings_analytic  # noqa: E402
+from _synthetic import THICKNESS, grid_plan, irregular_plan, timed  # noqa: E402
+
+WALL_HEIGHT = 240
+SCALE = 0.01
+
+
+def cutter(center, vertical, width, z_low, z_high):
+    """Box de découpe comme dans generate_*_cut_or_instance."""
+    depth = (THICKNESS + 15) * SCALE
+    box = trimesh.creation.box(extents=(width * SCALE, depth, (z_high - z_low) * SCALE))
+    if vertical:
+        box.apply_transform(
+            trimesh.transformations.rotation_matrix(np.radians(90), [0, 0, 1])
+        )
+    x, y = center
+    box.apply_translation((x * SCALE, -y * SCALE, (z_low + z_high) / 2 * SCALE))
+    return box
+
+
+def unguarded(*args):
+    """cut_openings_analytic sans limite sur la taille de la grille."""
+    ratio = openings.ANALYTIC_CUT_MAX_CELL_RATIO
+    openings.ANALYTIC_CUT_MAX_CELL_RATIO = float("inf")
+    try:
+        return cut_openings_analytic(*args)
+    finally:
+        openings.ANALYTIC_CUT_MAX_CELL_RATIO = ratio
+
+
+def compare(name, plan, repeat):
+    walls, doors, windows = plan
+    polygons = process_polygons(generate_wall_polygon_from_bbox(walls))
+    door_cuts = [cutter(c, v, 80, 0, 210) for c, v in doors]
+    window_cuts = [cutter(c, v, 100, 90, 200) for c, v in windows]
+    print(
+        f"Plan {name} : {len(walls)} murs, {len(door_cuts)} portes,"
+        f" {len(window_cuts)} fenêtres"
+    )
+
+    cutters = door_cuts + window_cuts
+
+    # Les variantes booléennes incluent l'extrusion des murs, que la découpe
+    # analytique remplace.
+    def two_pass():
+        wall_mesh = create_wall_meshes(polygons, WALL_HEIGHT, SCALE)
+        return cut_openings(cut_openings(wall_mesh, door_cuts), window_cuts)
+
+    def boolean(mode):
+        wall_mesh = create_wall_meshes(polygons, WALL_HEIGHT, SCALE)
+        return cut_openings(wall_mesh, cutters, mode=mode)
+
+    analytic_args = (polygons, WALL_HEIGHT, SCALE, cutters)
+    results = {
+        "two_pass": timed(two_pass, repeat=repeat),
+        "single": timed(boolean, "single", repeat=repeat),
+        "per_component": timed(boolean, "per_component", repeat=repeat),
+        "analytic": timed(cut_openings_analytic, *analytic_args, repeat=repeat),
+        "analytic_unguarded": timed(unguarded, *analytic_args, repeat=repeat),
+    }
+
+    reference = results["two_pass"][0]
+    for variant, (mesh, duration) in results.items():
+        volume_error = abs(mesh.volume - reference.volume) / reference.volume
+        area_error = abs(mesh.area - reference.area) / reference.area
+        print(
+            f"{variant:<20}{duration * 1000:>10.1f} ms  {len(mesh.faces):>7} faces"
+            f"  volume {mesh.volume:.6f} (écart {volume_error:.2e})"
+            f"  surface {mesh.area:.4f} (écart {area_error:.2e})"
+        )
+        if volume_error > 1e-5:
+            raise AssertionError(f"{variant}: volume différent de la découpe booléenne")
+        if area_error > 1e-5:
+            raise AssertionError(f"{variant}: surface différente de la découpe booléenne")
+
+    for variant in ("analytic", "analytic_unguarded"):
+        mesh = results[variant][0]
+        if len(mesh.faces) > len(results["single"][0].faces):
+            raise AssertionError(f"{variant}: plus de faces que la découpe booléenne")
+        if not mesh.is_watertight:
+            raise AssertionError(f"{variant}: les murs ne forment pas des solides fermés")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=4, help="Pièces par côté")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    compare("grille", grid_plan(args.rooms), args.repeat)
+    print()
+    compare("irrégulier", irregular_plan(args.rooms), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Benchmark de bout en bout de la génération 3D sur floorplan_dataset.
+
+Pour chaque image, mesure le temps de chaque étape (détection RFDETR,
+bbox_pipeline, union des murs, puis les étapes de
+generate_3d_model_from_polygons et l'export GLB), le pic de mémoire (RSS) du
+processus, le nombre de détections par classe et la taille du GLB. Les
+résultats sont écrits en JSON.
+
+Les caches (détections, géométrie, résultats) ne sont pas utilisés : chaque
+étape est réellement exécutée.
+
+Détections enregistrées : avec --record DIR, les détections brutes de RFDETR
+sont sauvegardées (une image = un fichier JSON) ; avec --detections DIR, elles
+sont relues à la place du modèle, ce qui permet de mesurer les étapes
+géométriques sans les poids.
+
+Comparaison : avec --compare baseline.json, les étapes plus lentes que la
+référence de plus de --threshold (en proportion) et de plus de --min-delta-ms
+sont signalées, et le script se termine avec le code 1.
+
+Usage (depuis la racine du dépôt) :
+    python benchmarks/bench_pipeline.py --record recorded/ --output baseline.json
+    python benchmarks/bench_pipeline.py --detections recorded/ --output new.json \\
+        --compare baseline.json --threshold 0.2
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import numpy as np
+import supervision as sv
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from constants import DATASET, OBJ_MODELS, TEXTURES_FOLDER  # noqa: E402
+from bounding_boxes import bbox_pipeline  # noqa: E402
+from walls import generate_wall_polygon_from_bbox  # noqa: E402
+from utils import process_polygons  # noqa: E402
+from generate_model import generate_3d_model_from_polygons  # noqa: E402
+import extrusion_pool  # noqa: E402
+
+# Paramètres de detect_and_generate_3d
+WALL_HEIGHT = 240
+OPENING_SCALE = 0.6
+CLASSES = {1: "door", 2: "wall", 3: "window"}
+
+
+def peak_rss_mb():
+    """Pic de mémoire résidente du processus depuis son démarrage, en Mo."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en kilo-octets sous Linux
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def save_detections(path, detections):
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "xyxy": detections.xyxy.tolist(),
+                "class_id": detections.class_id.tolist(),
+                "confidence": detections.confidence.tolist(),
+            },
+            f,
+        )
+
+
+def load_detections(path):
+    with open(path) as f:
+        data = json.load(f)
+    return sv.Detections(
+        xyxy=np.asarray(data["xyxy"], dtype=float).reshape(-1, 4),
+        class_id=np.asarray(data["class_id"], dtype=int),
+        confidence=np.asarray(data["confidence"], dtype=float),
+    )
+
+
+def detect(image_path, args):
+    """Détections brutes, depuis l'enregistrement ou le modèle."""
+    name = os.path.basename(image_path)
+    if args.detections:
+        return load_detections(os.path.join(args.detections, f"{name}.json"))
+
+    from rfdetr_detection import rfdetr_locally_detection
+
+    detections, _ = rfdetr_locally_detection(image_path)
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+        save_detections(os.path.join(args.record, f"{name}.json"), detections)
+    return detections
+
+
+def run_image(image_path, args):
+    """Exécute la chaîne complète sur une image et retourne ses mesures."""
+    stages = {}
+
+    start = time.perf_counter()
+    detections = detect(image_path, args)
+    if not args.detections:
+        stages["detection"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bbox = bbox_pipeline(detections)
+    stages["bbox_pipeline"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    polygons = process_polygons(generate_wall_polygon_from_bbox(bbox["wall_boxes"]))
+    stages["wall_union"] = time.perf_counter() - start
+
+    # Les étapes internes sont délimitées par les appels à progress
+    marks = []
+    scale = args.scale
+    scene = generate_3d_model_from_polygons(
+        wall_polygons=polygons,
+        wall_bboxes=bbox["wall_boxes"],
+        door_data=(f"{OBJ_MODELS}/Door.obj", bbox["door_boxes"], scale * OPENING_SCALE),
+        window_data=(
+            f"{OBJ_MODELS}/Window.obj",
+            bbox["window_boxes"],
+            scale * OPENING_SCALE,
+        ),
+        real_world_scale=scale,
+        wall_height=WALL_HEIGHT,
+        floor_textures=[f"{TEXTURES_FOLDER}/WoodFloor039.jpg"],
+        image_path=image_path,
+        output_path=None,
+        progress=lambda stage: marks.append((stage, time.perf_counter())),
+    )
+    glb = scene.export(file_type="glb")
+    marks.append((None, time.perf_counter()))
+    for (stage, begin), (_, end) in zip(marks, marks[1:]):
+        stages[stage] = end - begin
+
+    class_ids = np.asarray(detections.class_id)
+    return {
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb(),
+        "detections": {
+            label: int((class_ids == class_id).sum())
+            for class_id, label in CLASSES.items()
+        },
+        "boxes": {key: len(value) for key, value in bbox.items()},
+        "glb_bytes": len(glb),
+    }
+
+
+def best_of(runs):
+    """Garde, pour chaque étape, le temps minimal sur les répétitions."""
+    result = dict(runs[-1])
+    result["stages"] = {
+        stage: min(run["stages"][stage] for run in runs) for stage in runs[-1]["stages"]
+    }
+    return result
+
+
+def compare(results, baseline, threshold, min_delta):
+    """Liste des (nom, étape, référence, mesure) qui ont ralenti au-delà du seuil."""
+    regressions = []
+    items = [("total", results["totals"], baseline.get("totals", {}))]
+    for name, image in results["images"].items():
+        if name in baseline.get("images", {}):
+            items.append((name, image["stages"], baseline["images"][name]["stages"]))
+    for name, stages, reference in items:
+        for stage, duration in stages.items():
+            before = reference.get(stage)
+            if before is None:
+                continue
+            if duration > before * (1 + threshold) and duration - before > min_delta:
+                regressions.append((name, stage, before, duration))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--dataset", default=DATASET)
+    parser.add_argument("--output", default="bench_pipeline.json")
+    parser.add_argument("--detections", help="Dossier de détections enregistrées")
+    parser.add_argument("--record", help="Dossier où enregistrer les détections")
+    parser.add_argument("--scale", type=float, default=0.01, help="Mètres par pixel")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--no-warmup",
+        action="store_true",
+        help="Mesurer aussi le premier passage (chargement des modèles 3D et textures)",
+    )
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--compare", help="Fichier JSON de référence")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--min-delta-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    # Mesurer la triangulation, pas la relecture du cache
+    extrusion_pool.geometry_cache = None
+
+    images = sorted(glob.glob(os.path.join(args.dataset, "*.png")))
+    if args.detections:
+        images = [
+            path
+            for path in images
+            if os.path.exists(os.path.join(args.detections, f"{os.path.basename(path)}.json"))
+        ]
+    images = images[: args.limit]
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "detector": "recorded" if args.detections else "rfdetr",
+            "scale": args.scale,
+            "repeat": args.repeat,
+        },
+        "images": {},
+        "totals": {},
+    }
+
+    # Passage à blanc : chargement des assets, du modèle et des imports paresseux
+    if images and not args.no_warmup:
+        run_image(images[0], args)
+
+    for image_path in images:
+        name = os.path.basename(image_path)
+        image = best_of([run_image(image_path, args) for _ in range(args.repeat)])
+        results["images"][name] = image
+        for stage, duration in image["stages"].items():
+            results["totals"][stage] = results["totals"].get(stage, 0.0) + duration
+        print(
+            f"{name:<16}{sum(image['stages'].values()) * 1000:>10.1f} ms"
+            f"{image['peak_rss_mb']:>10.0f} Mo{image['glb_bytes'] / 1024:>10.0f} Ko"
+            f"  {image['detections']}"
+        )
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    print("Total par étape :")
+    for stage, duration in results["totals"].items():
+        print(f"  {stage:<16}{duration * 1000:>10.1f} ms")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Résultats écrits dans {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(
+            results, baseline, args.threshold, args.min_delta_ms / 1000
+        )
+        for name, stage, before, after in regressions:
+            print(
+                f"⚠️ {name} / {stage} : {before * 1000:.1f} ms -> {after * 1000:.1f} ms"
+                f" (+{(after / before - 1) * 100:.0f} %)"
+            )
+        if regressions:
+            sys.exit(1)
+        print(f"Aucune étape plus lente de plus de {args.threshold * 100:.0f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark de extract_room_polygons : différence avec l'enveloppe vs trous des murs.
+
+L'ancienne version refait l'union des murs et retourne aussi la zone
+extérieure ; la nouvelle extrait les trous des murs déjà fusionnés. Sur
+une grille synthétique de pièces, les pièces trouvées doivent être les mêmes,
+sans la zone extérieure.
+
+Usage (depuis la racine du dépôt) :
+    python benchmarks/bench_rooms.py --rooms 20
+"""
+
+import argparse
+import os
+import sys
+
+from shapely.geometry import MultiPolygon, Polygon, box
+from shapely.ops import unary_union
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from walls import generate_wall_polygon_from_bbox  # noqa: E402
+from utils import process_polygons  # noqa: E402
+from rooms import extract_room_polygons  # noqa: E402
+from _synthetic import ROOM, THICKNESS, grid_walls, timed  # noqa: E402
+
+
+def legacy_room_polygons(wall_polygons):
+    """Ancienne implémentation : enveloppe moins l'union des murs."""
+    walls_union = unary_union(wall_polygons)
+    envelope = box(*walls_union.bounds)
+    free_space = envelope.difference(walls_union)
+    if isinstance(free_space, Polygon):
+        return [free_space]
+    elif isinstance(free_space, MultiPolygon):
+        return list(free_space.geoms)
+    return []
+
+
+def synthetic_walls(rooms):
+    """Grille de rooms x rooms pièces, plus une aile en L ouverte sur l'extérieur."""
+    size = rooms * ROOM
+    return grid_walls(rooms) + [
+        [size, 0, size + ROOM + THICKNESS, THICKNESS],
+        [size + ROOM, 0, size + ROOM + THICKNESS, ROOM + THICKNESS],
+        [size, ROOM, size + ROOM + THICKNESS, ROOM + THICKNESS],
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=10, help="Pièces par côté")
+    args = parser.parse_args()
+
+    polygons = process_polygons(generate_wall_polygon_from_bbox(synthetic_walls(args.rooms)))
+    legacy, legacy_time = timed(legacy_room_polygons, polygons)
+    rooms, rooms_time = timed(extract_room_polygons, polygons)
+
+    print(f"enveloppe      {legacy_time * 1000:>10.1f} ms  {len(legacy)} régions")
+    print(f"trous des murs {rooms_time * 1000:>10.1f} ms  {len(rooms)} pièces")
+
+    # Mêmes pièces, sans la région extérieure (la plus grande de l'ancienne version)
+    expected = sorted(p.area for p in legacy)[:-1]
+    found = sorted(p.area for p in rooms)
+    if len(expected) != len(found) or any(
+        abs(a - b) > 1e-6 * a for a, b in zip(expected, found)
+    ):
+        raise AssertionError("Pièces différentes de l'ancienne extraction")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark du temps de démarrage du backend.
+
+Mesure, dans des processus Python neufs :
+    - le temps d'import du module `app` (ce que fait uvicorn avant d'accepter
+      des connexions) et la liste des modules lourds chargés à l'import ;
+    - avec --server, le temps jusqu'à ce que le serveur réponde sur `/`, puis
+      jusqu'à ce que `/ready` réponde 200 (modèles chargés).
+
+Les modules lourds (torch, rfdetr, open_clip, matplotlib...) ne doivent
+être importés qu'au premier usage : la liste affichée doit rester vide.
+
+Usage (depuis le dossier de travail du backend, celui qui contient
+checkpoints/, textures/ et 3D_models/) :
+    python benchmarks/bench_startup.py --repeat 5
+    python benchmarks/bench_startup.py --server --port 8765
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+HEAVY_MODULES = [
+    "torch",
+    "torchvision",
+    "open_clip",
+    "rfdetr",
+    "supervision",
+    "ezdxf",
+    "fitz",
+    "cairosvg",
+    "matplotlib",
+    "cv2",
+]
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+sys.path.insert(0, {BACKEND_DIR!r})
+start = time.perf_counter()
+import app
+duration = time.perf_counter() - start
+heavy = [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+print(json.dumps({{"import_s": duration, "heavy": heavy}}))
+"""
+
+
+def measure_import():
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_s"] = time.perf_counter() - start
+    return result
+
+
+def wait_for(url, timeout, expected_status=200):
+    """Attend que `url` réponde avec le statut attendu ; retourne la date ou None."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == expected_status:
+                    return time.perf_counter()
+        except urllib.error.HTTPError as e:
+            if e.code == expected_status:
+                return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    return None
+
+
+def measure_server(port, timeout):
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "__main__.py"), "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        listening = wait_for(f"http://127.0.0.1:{port}/", timeout)
+        ready = wait_for(f"http://127.0.0.1:{port}/ready", timeout)
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "listening_s": None if listening is None else listening - start,
+        "ready_s": None if ready is None else ready - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--server", action="store_true", help="Démarrer aussi le serveur")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    runs = [measure_import() for _ in range(args.repeat)]
+    print(
+        f"import app      {statistics.median(r['import_s'] for r in runs) * 1000:>8.0f} ms"
+        f"  (processus complet {statistics.median(r['process_s'] for r in runs) * 1000:.0f} ms)"
+    )
+    heavy = runs[-1]["heavy"]
+    print(f"modules lourds importés : {', '.join(heavy) if heavy else 'aucun'}")
+
+    if args.server:
+        result = measure_server(args.port, args.timeout)
+        for key, label in (("listening_s", "serveur à l'écoute"), ("ready_s", "/ready = 200")):
+            value = result[key]
+            print(f"{label:<20}" + ("non atteint" if value is None else f"{value * 1000:>8.0f} ms"))
+
+    if heavy:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
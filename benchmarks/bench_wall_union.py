@@ -0,0 +1,78 @@
+"""
+Benchmark de generate_wall_polygon_from_bbox : union en boucle vs union en cascade.
+
+Usage (depuis la racine du dépôt) :
+    python benchmarks/bench_wall_union.py              # plans de floorplan_dataset
+    python benchmarks/bench_wall_union.py --synthetic 500
+
+Sur floorplan_dataset, les boxes des murs viennent de detect_bboxes (cache de
+détections, sinon modèle RFDETR). --synthetic génère une grille de N murs et ne
+demande pas les poids du modèle.
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+from shapely.geometry import Polygon, box
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from walls import generate_wall_polygon_from_bbox  # noqa: E402
+from _synthetic import crossing_walls, timed  # noqa: E402
+
+
+def legacy_wall_polygon(wall_bbox):
+    """Ancienne implémentation : une union par mur."""
+    wall_polygon = Polygon()
+    for x_min, y_min, x_max, y_max in wall_bbox:
+        bbox_width = x_max - x_min
+        bbox_height = y_max - y_min
+        walls = box(x_min, -y_min, (x_min + bbox_width + 2), -(y_min + bbox_height + 2))
+        wall_polygon = wall_polygon.union(walls)
+    return wall_polygon
+
+
+def dataset_walls():
+    """Boxes des murs pour chaque image de floorplan_dataset."""
+    from constants import DATASET
+    from detect_and_generate import detect_bboxes
+
+    for image_path in sorted(glob.glob(f"{DATASET}/*.png")):
+        with open(image_path, "rb") as f:
+            image_bytes = f.read()
+        yield os.path.basename(image_path), detect_bboxes(image_bytes)[
+            "wall_boxes"
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--synthetic", type=int, default=None, help="Nombre de murs")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        cases = [(f"synthetic-{args.synthetic}", crossing_walls(args.synthetic))]
+    else:
+        cases = dataset_walls()
+
+    total_legacy = total_new = 0.0
+    print(f"{'plan':<20}{'murs':>6}{'boucle (ms)':>14}{'cascade (ms)':>14}{'gain':>8}")
+    for name, wall_boxes in cases:
+        legacy, t_legacy = timed(legacy_wall_polygon, wall_boxes, repeat=args.repeat)
+        new, t_new = timed(generate_wall_polygon_from_bbox, wall_boxes, repeat=args.repeat)
+        if not legacy.equals(new):
+            raise AssertionError(f"{name}: les polygones diffèrent")
+        total_legacy += t_legacy
+        total_new += t_new
+        print(
+            f"{name:<20}{len(wall_boxes):>6}{t_legacy * 1000:>14.2f}"
+            f"{t_new * 1000:>14.2f}{t_legacy / max(t_new, 1e-9):>7.1f}x"
+        )
+    print(f"Total : {total_legacy * 1000:.1f} ms -> {total_new * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()